@@ -1,8 +1,17 @@
+import time
+startup = [('start', time.perf_counter())]    # Startup checkpoints for --profile-startup
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import *
-import PyCO2SYS as pyc02
-import pandas as pd
-import openpyxl as px
-from datetime import datetime
+from tkinter import filedialog, ttk
+startup.append(('import tkinter', time.perf_counter()))
+import PyCO2Sys_Batch as batch    # Light: PyCO2SYS and pandas are loaded on first use
+import PyCO2Sys_History as hist    # Light: openpyxl is loaded on first export
+import PyCO2Sys_Sweep as sweep
+from PyCO2Sys_Timing import enable_log, profiled, timer
+import PyCO2Sys_Validate as validate
+startup.append(('import app modules (numpy)', time.perf_counter()))
 
 # ----- Instructions -----
 # 1. Initialize the program
@@ -47,7 +56,26 @@ class Checkbar(Frame):
         return map((lambda var: var.get()), self.vars)
 
 
+# ----- Print the startup import-time breakdown, then time the deferred heavy imports -----
+def print_startup(checkpoints, deferred):
+    print('----- Startup profile (seconds) -----')
+    for (_, prev), (stage, now) in zip(checkpoints, checkpoints[1:]):
+        print(f'{stage:<32}{now - prev:>8.3f}')
+    print(f'{"time to first window":<32}{checkpoints[-1][1] - checkpoints[0][1]:>8.3f}')
+    print('----- Deferred (background warm-up / first use) -----')
+    for stage, seconds in deferred.items():
+        print(f'{stage:<32}{seconds:>8.3f}')
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CO2Sys Program')
+    parser.add_argument('--profile-startup', action='store_true', help='Print an import-time breakdown of startup')
+    parser.add_argument('--timing-log', help='Append per-stage timings as JSON lines to this file')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='Profile every Get Results solve')
+    args = parser.parse_args()
+    if args.timing_log:
+        enable_log(args.timing_log)
+
     # Initialise external window
     root = Tk()
     root.geometry('900x900'), root.title('CO2Sys Program')
@@ -65,7 +93,7 @@ if __name__ == '__main__':
     canvas4 = Canvas(root, width=300, height=300, relief='solid')
     canvas4.pack()
 
-    canvas5 = Canvas(root, width=600, height=25, relief='solid')
+    canvas5 = Canvas(root, width=600, height=60, relief='solid')
     canvas5.pack()
 
     lbl1 = Label(root, text = 'Select input parameters:')    # Create label
@@ -77,6 +105,129 @@ if __name__ == '__main__':
     lng.pack(side=TOP, fill=X), lng.config(relief=GROOVE, bd=2)    # Place checkbar and align top, horizontal with border
     canvas1.create_window(150, 70, window=lng)    # Place checkbar at x,y
 
+    # ----- Open the append-only results history (seeded from an existing Excel history below) -----
+    new_store = not os.path.exists(hist.default_store)
+    res_hist = hist.open_history(hist.default_store, buffer_size=1)
+
+    # ----- Cache repeated solves (e.g. after going Back and Next without changes) between sessions -----
+    solve_cache = batch.SolveCache(maxsize=256, path='PyCO2Sys_Solve_Cache.json')
+    gui_stages = 'gui.'    # Timing prefix, keeps single-sample latencies apart from batch chunks and sweep blocks
+
+    # ----- Background worker: run solver and file I/O off the Tk main thread, poll for the result -----
+    worker = ThreadPoolExecutor(max_workers=2)
+
+    running = []    # State dicts ({'cancelled': ...}) of jobs still running, cancelled when the window closes
+
+    def run_in_background(job, on_done, on_error, on_poll=None, state=None):
+        future = worker.submit(job)
+        if state is not None:
+            running.append(state)
+
+        def poll():
+            if future.done() and state is not None:
+                running[:] = [other for other in running if other is not state]
+            if future.cancelled():
+                return
+            elif future.done():
+                error = future.exception()
+                on_error(error) if error is not None else on_done(future.result())
+            else:
+                if on_poll is not None:
+                    on_poll()
+                root.after(50, poll)
+
+        root.after(50, poll)
+        return future
+
+    # ----- Status line for background jobs started from the main window -----
+    status = Label(root, text='')
+    status.config(font=('Segoe UI', 10)), canvas5.create_window(150, 45, window=status)
+
+    # ----- Import an existing Excel history on the worker, so a large workbook never blocks startup -----
+    if new_store and os.path.exists(hist.default_xlsx):
+        status.config(text='Importing history...')
+        run_in_background(lambda: hist.import_xlsx(res_hist, hist.default_xlsx),
+                          lambda n_rows: status.config(text=f'Imported {n_rows} history rows'),
+                          lambda error: status.config(text=f'History import failed: {error}'))
+
+    # ----- Write the results history to the Excel workbook layout on demand -----
+    def export_hist():
+        export.config(state=DISABLED)
+        status.config(text='Exporting history...')
+
+        def done(_):
+            export.config(state=NORMAL), status.config(text=f'History exported to {hist.default_xlsx}')
+
+        def failed(error):
+            export.config(state=NORMAL), status.config(text=f'Export failed: {error}')
+
+        run_in_background(lambda: hist.export_xlsx(res_hist, hist.default_xlsx), done, failed)
+
+    # ----- Solve a whole CSV/Parquet file in chunks, cancellable between chunks -----
+    class Cancelled(Exception):
+        pass
+
+    def run_batch():
+        in_path = filedialog.askopenfilename(title='Batch input', filetypes=[('Tables', '*.csv *.parquet *.pq')])
+        if not in_path:
+            return
+        out_path = filedialog.asksaveasfilename(title='Batch output', defaultextension='.csv',
+                                                filetypes=[('CSV', '*.csv'), ('Parquet', '*.parquet')])
+        if not out_path:
+            return
+
+        # ----- Use the checked parameters if two are selected, else par1_type/par2_type columns -----
+        checked = [i + 1 for i, var in enumerate(lng.state()) if var == 1]
+        par_types = checked if len(checked) == 2 else [None, None]
+        job = {'cancelled': False, 'progress': 'Batch started...', 'done': 0, 'total': None}
+
+        # ----- Runs on the worker thread: only record progress, the main thread polls it into the widgets -----
+        def progress(n_chunks, done, total):
+            if job['cancelled']:
+                raise Cancelled
+            job['progress'] = f'Batch: {done}{f"/{total}" if total else ""} rows processed'
+            job['done'], job['total'] = done, total
+
+        def show_progress():
+            status.config(text=job['progress'])
+            if job['total']:
+                batch_bar.stop(), batch_bar.config(mode='determinate', maximum=job['total'], value=job['done'])
+
+        def finish(text):
+            batch_bar.stop(), batch_bar.config(mode='determinate', value=0)
+            batch_btn.config(state=NORMAL), cancel_batch.config(state=DISABLED)
+            status.config(text=text)
+
+        def failed(error):
+            finish('Batch cancelled' if isinstance(error, Cancelled) else f'Batch failed: {error}')
+
+        def cancel():
+            job['cancelled'] = True
+            status.config(text='Cancelling after the current chunk...')
+
+        batch_btn.config(state=DISABLED), cancel_batch.config(state=NORMAL, command=cancel)
+        batch_bar.config(mode='indeterminate'), batch_bar.start(10)
+        quarantine_path = batch.default_quarantine_path(out_path)
+
+        def solved(counts):
+            n_rows, n_bad = counts
+            quarantined = f', {n_bad} invalid rows -> {os.path.basename(quarantine_path)}' if n_bad else ''
+            finish(f'Batch: {n_rows} rows solved -> {os.path.basename(out_path)}{quarantined}')
+
+        run_in_background(lambda: batch.solve_stream(in_path, out_path, 10000, None, *par_types, progress=progress,
+                                                     quarantine_path=quarantine_path),
+                          solved, failed, show_progress, job)
+
+    # ----- Cancel running jobs and wait for the current one to stop before closing the history -----
+    def close():
+        for job in running:
+            job['cancelled'] = True    # Batches stop after the current chunk, solves skip the history append
+        status.config(text='Closing...'), root.update_idletasks()
+        worker.shutdown(wait=True, cancel_futures=True)
+        res_hist.close()
+        solve_cache.save()
+        root.destroy()
+
     # ----- Create a popup window with instructions on how to use the program -----
     def inst():
         puw = Toplevel()    # puw = pop up window
@@ -200,29 +351,42 @@ if __name__ == '__main__':
                 canvas4.delete('all')
                 next_consts.config(state=DISABLED), back1.config(state=DISABLED)
 
-                entries = [entry1.get(), entry2.get(), entry3.get(), entry4.get(), entry5.get(),
-                           entry6.get(), entry7.get(), entry8.get(), entry9.get(), entry10.get()]
-                char_remove = ["."]
-                entry_is_num = []
-                
-                # ----- Remove decimals from inputs to check if all numeric -----
-                for x in char_remove:
-                    for i in range(10):
-                        entry_is_num.append(entries[i].replace(x, ""))
+                with timer.prefixed(gui_stages), timer.stage('validate'):
+                    entries = [entry1.get(), entry2.get(), entry3.get(), entry4.get(), entry5.get(),
+                               entry6.get(), entry7.get(), entry8.get(), entry9.get(), entry10.get()]
+                    keys = validate.value_keys + ['u_' + key for key in validate.uncertainty_keys]
+
+                    # ----- Parse and range-check all inputs (negative and scientific notation values are numbers) -----
+                    issues = validate.check_sample(dict(zip(keys, entries)), par1_type, par2_type)
+                    missing = len([i for i in range(10) if entries[i].replace(" ", "") == '']) != 0
+                    non_numeric = len([i for i in issues if i[1] == 'missing or not a number']) != 0
+
+                    names = {'par1': pars_slctd[0], 'par2': pars_slctd[1], 'salinity': 'Salinity',
+                             'temperature': 'Temperature', 'pressure': 'Pressure'}
+                    names.update({'u_' + key: f'{name} error' for key, name in names.items()})
+                    out_of_range = [f'{names[field]} {problem}' for field, problem, severity in issues
+                                    if severity == 'error']
 
                 # ----- Check if any inputs are empty -----
-                if len([i for i in range(10) if entries[i].replace(" ", "") == '']) != 0:
+                if missing:
                     canvas3.delete('all')
 
                     lbl15 = Label(root, text='\n    Parameter, initial condition, and/or error values are missing    \n', relief='solid')    # Create label
                     lbl15.config(font=('Segoe UI', 16)), canvas3.create_window(300, 100, window=lbl15)    # Place label at x,y
 
                 # ----- Check if all inputs are numeric -----
-                elif len([k for k in range(10) if entry_is_num[k].isnumeric() != True]) != 0:
+                elif non_numeric:
                     canvas3.delete('all')
 
                     lbl15 = Label(root, text='\n    One or more inputs is non-numeric    \n', relief='solid')    # Create label
                     lbl15.config(font=('Segoe UI', 16)), canvas3.create_window(300, 100, window=lbl15)    # Place label at x,y
+
+                # ----- Check physical ranges and the parameter pair -----
+                elif out_of_range:
+                    canvas3.delete('all')
+
+                    lbl15 = Label(root, text=f'\n    {out_of_range[0]}    \n', relief='solid')    # Create label
+                    lbl15.config(font=('Segoe UI', 16)), canvas3.create_window(300, 100, window=lbl15)    # Place label at x,y
             
                 else:
                     canvas3.delete('all')   # Clear previous selections
@@ -234,17 +398,8 @@ if __name__ == '__main__':
                     # ----------------------------------
 
                     # ----- Constant Sets -----
-                    k_carbonic_opts = ['Roy et al. (1993)', 'Goyet & Poisson (1989)', 'Hansson (1973) refit by Dickson & Millero (1987)', 
-                                        'Mehrbach et al. (1973) refit by Dickson & Millero (1987)', 
-                                        'Hansson & Mehrbach refit by Dickson & Millero (1987)', 
-                                        'GEOSECS constants (NBS scale) from Mehrbach et al. (1973)', 
-                                        'Constants from Peng et al. (NBS scale) from Mehrbach et al. (1973)', 
-                                        'Millero (1979)', 'Cai & Wang (1998)', 'Lueker et al. (2000)', 'Mojica Prieto & Millero (2002)', 
-                                        'Millero et al. (2002)', 'Millero et al. (2006)', 'Millero (2010)', 'Waters et al. (2014)', 
-                                        'Sulphis et al. (2020)', 'Schockman & Byrne (2021)']
-                    k_bisulphate_opts = ['Dickson (1990)', 'Khoo et al. (1977)', 'Waters & Millero (2013) / Waters et al. (2014)']
-                    tot_borate_opts = ['Uppström (1974)', 'Lee et al. (2010)', 'Kuliński et al. (2018)']
-                    k_fluoride_opts = ['Dickson & Riley (1979)', 'Perez & Fraga (1987)']
+                    k_carbonic_opts, k_bisulphate_opts = batch.k_carbonic_opts, batch.k_bisulphate_opts
+                    tot_borate_opts, k_fluoride_opts = batch.tot_borate_opts, batch.k_fluoride_opts
 
                     # ----- Assign default values -----
                     k_H2CO3_var = StringVar(root)
@@ -307,8 +462,18 @@ if __name__ == '__main__':
                         for j in range(4):
                             drpdwns[j].config(state=DISABLED)
                         #------------------------------
+
+                        # ----- Clear results -----
+                        def back_3():
+                            canvas4.delete('all')
+                            get_ins.config(state=NORMAL), back2.config(state=NORMAL)
+
+                            # ----- Enable dropdowns -----
+                            for j in range(4):
+                                drpdwns[j].config(state=NORMAL)
+                            #------------------------------
                         
-                        par_codes = ['alkalinity', 'dic', 'pH', 'pCO2']    # Parameter codes in CO2Sys
+                        par_codes = batch.par_codes    # Parameter codes in CO2Sys
 
                         # ----- Get values from user input -----
                         par1, par2, sal = entry1.get(), entry2.get(), entry3.get()
@@ -323,58 +488,154 @@ if __name__ == '__main__':
                         borate = [i for i, j in enumerate(tot_borate_opts) if j == tot_borate_var.get()][0] + 1
                         fluoride = [i for i, j in enumerate(k_fluoride_opts) if j == k_HF_var.get()][0] + 1
 
-                        # ----- Call CO2Sys program -----
-                        co2sys = pyc02.sys(par1, par2, par1_type, par2_type, opt_k_carbonic = carbonic, opt_k_bisulfate = bisulphate,
-                                        opt_total_borate = borate, opt_k_fluoride = fluoride, salinity=sal, temperature=temp, pressure=prsr,
-                                        uncertainty_into = par_codes,
-                                        uncertainty_from = {'par1': par1_err, 'par2': par2_err, 'salinity': sal_err, 
-                                                            'temperature': temp_err, 'pressure': prsr_err})
+                        sample = {'par1': par1, 'par2': par2, 'salinity': sal, 'temperature': temp, 'pressure': prsr}
+                        range_warnings = [field.capitalize() for field, _, severity in
+                                          validate.check_sample(sample, par1_type, par2_type, carbonic)
+                                          if severity == 'warning']
+
+                        # ----- Call CO2Sys program and store results on the background worker -----
+                        job = {'cancelled': False}
+
+                        def solve_job():
+                            with profiled(args.profile), timer.prefixed(gui_stages):
+                                return solve_and_store()
+
+                        def solve_and_store():
+                            hits = solve_cache.hits
+                            co2sys = solve_cache.solve(par1, par2, par1_type, par2_type, opt_k_carbonic = carbonic, opt_k_bisulfate = bisulphate,
+                                            opt_total_borate = borate, opt_k_fluoride = fluoride, salinity=sal, temperature=temp, pressure=prsr,
+                                            uncertainty_from = {'par1': par1_err, 'par2': par2_err, 'salinity': sal_err, 
+                                                                'temperature': temp_err, 'pressure': prsr_err})
+
+                            job['cache_hit'] = solve_cache.hits > hits
+
+                            # ----- Append results, errors, inputs, constant sets and time to the results history store -----
+                            inputs = {'par1': par1, 'par2': par2, 'par1_type': par1_type, 'par2_type': par2_type,
+                                      'salinity': sal, 'temperature': temp, 'pressure': prsr, 'u_par1': par1_err,
+                                      'u_par2': par2_err, 'u_salinity': sal_err, 'u_temperature': temp_err,
+                                      'u_pressure': prsr_err, 'opt_k_carbonic': carbonic, 'opt_k_bisulfate': bisulphate,
+                                      'opt_total_borate': borate, 'opt_k_fluoride': fluoride}
+                            if not job['cancelled']:
+                                res_hist.append(hist.history_row(co2sys, inputs))
+                            return co2sys
+
+                        # ----- Per-stage timings (last, rolling p50/p95) shown under the results -----
+                        def show_timings():
+                            # ----- A cached result shows the lookup time, not an earlier solve's time -----
+                            solve_stage = 'cache_hit' if job.get('cache_hit') else 'solve+uncertainty'
+                            stages = ['validate', solve_stage, 'history_write', 'render']
+                            lbl21 = Label(root, text=timer.readout(stages, gui_stages), justify='left')
+                            lbl21.config(font=('Segoe UI', 8)), canvas4.create_window(150, 240, window = lbl21)
 
                         # ----- Compile and display carbonate system results -----
-                        par_results = [co2sys['alkalinity'], co2sys['dic'], co2sys['pH'], co2sys['pCO2']]
-
-                        lbl10 = Label(root, text=f'\n    {pars_slctd[0]}: {co2sys[par_codes[boxes_checked[0]]]} ± {entry6.get()}\
-                                    \n    {pars_slctd[1]}: {co2sys[par_codes[boxes_checked[1]]]} ± {entry7.get()} \
-                                    \n    {pars_unslctd[0]}: {co2sys[par_codes[boxes_unchecked[0]]]} ± {co2sys["u_" + par_codes[boxes_unchecked[0]]]}\
-                                    \n    {pars_unslctd[1]}: {co2sys[par_codes[boxes_unchecked[1]]]} ± {co2sys["u_" + par_codes[boxes_unchecked[1]]]}\
-                                    \n', justify='left', relief='solid')
-                        lbl10.config(font=('Segoe UI', 10)), canvas4.create_window(150, 75, window = lbl10)
-
-                        # ----- Initialise results history Excel workbook and insert results and time -----
-                        res_hist_path = 'PyCO2Sys_Result_History.xlsx'
-                        wb = px.load_workbook(res_hist_path)
-                        page = wb.active
-                        page.insert_rows(4,1)
-                        page['A4'], page['B4'], page['C4'] = datetime.now(), par_results[0], par_results[1]
-                        page['D4'], page['E4'] = par_results[2], par_results[3]
-                        # ---------------------------------------------------------------------------------
-
-                        # ----- Input error values into worksheet -----
-                        page['G4'], page['H4'] = co2sys['u_alkalinity'], co2sys['u_dic']
-                        page['I4'], page['J4'] = co2sys['u_pH'], co2sys['u_pCO2']
-                        # ---------------------------------------------
-
-                        # ----- Save workbook -----
-                        wb.save(res_hist_path)
+                        def show_results(co2sys):
+                            if job['cancelled']:
+                                return
+                            with timer.prefixed(gui_stages), timer.stage('render'):
+                                render_results(co2sys)
+                            show_timings()
+
+                        def render_results(co2sys):
+                            canvas4.delete('all'), busy.destroy()
+
+                            lbl10 = Label(root, text=f'\n    {pars_slctd[0]}: {co2sys[par_codes[boxes_checked[0]]]} ± {par1_err}\
+                                        \n    {pars_slctd[1]}: {co2sys[par_codes[boxes_checked[1]]]} ± {par2_err} \
+                                        \n    {pars_unslctd[0]}: {co2sys[par_codes[boxes_unchecked[0]]]} ± {co2sys["u_" + par_codes[boxes_unchecked[0]]]}\
+                                        \n    {pars_unslctd[1]}: {co2sys[par_codes[boxes_unchecked[1]]]} ± {co2sys["u_" + par_codes[boxes_unchecked[1]]]}\
+                                        \n', justify='left', relief='solid')
+                            lbl10.config(font=('Segoe UI', 10)), canvas4.create_window(150, 75, window = lbl10)
+
+                            clr_results = Button(root, text = 'Clear Results', command = back_3, background='brown', foreground = 'white', width=10)
+                            canvas4.create_window(150, 150, window = clr_results)
+
+                            # ----- Warn if the sample is outside the selected K1/K2 constant set's calibration range -----
+                            if range_warnings:
+                                lbl20 = Label(root, text=f'{" and ".join(range_warnings)} outside the K1/K2 calibration range',
+                                              foreground='brown')
+                                lbl20.config(font=('Segoe UI', 8)), canvas4.create_window(150, 185, window = lbl20)
+
+                        def show_error(error):
+                            if job['cancelled']:
+                                return
+                            canvas4.delete('all'), busy.destroy()
+
+                            lbl10 = Label(root, text=f'\n    CO2Sys failed: {error}    \n', relief='solid')
+                            lbl10.config(font=('Segoe UI', 10)), canvas4.create_window(150, 75, window = lbl10)
+
+                            clr_results = Button(root, text = 'Clear Results', command = back_3, background='brown', foreground = 'white', width=10)
+                            canvas4.create_window(150, 150, window = clr_results)
+
+                        # ----- Busy indicator, results are discarded if cancelled -----
+                        def cancel():
+                            job['cancelled'] = True
+                            future.cancel(), busy.destroy()
+                            back_3()
+
+                        busy = ttk.Progressbar(root, mode='indeterminate', length=200)
+                        busy.start(10), canvas4.create_window(150, 75, window = busy)
 
-                        # ----- Clear results -----
-                        def back_3():
+    # ----- Buttons -----
+                        cncl = Button(root, text = 'Cancel', command = cancel, background='brown', foreground = 'white', width=10)
+                        canvas4.create_window(150, 150, window = cncl)
+
+                        future = run_in_background(solve_job, show_results, show_error, state=job)
+
+                    # ----- Sweep the sample over every constant-set combination, save the table, show the spread -----
+                    def sweep_sets():
+                        out_path = filedialog.asksaveasfilename(title='Sweep output', defaultextension='.csv',
+                                                                filetypes=[('CSV', '*.csv'), ('Parquet', '*.parquet')])
+                        if not out_path:
+                            return
+
+                        canvas4.delete('all')
+                        get_ins.config(state=DISABLED), back2.config(state=DISABLED), sweep_btn.config(state=DISABLED)
+
+                        def back_4():
                             canvas4.delete('all')
-                            get_ins.config(state=NORMAL), back2.config(state=NORMAL)
+                            get_ins.config(state=NORMAL), back2.config(state=NORMAL), sweep_btn.config(state=NORMAL)
 
-                            # ----- Enable dropdowns -----
-                            for j in range(4):
-                                drpdwns[j].config(state=NORMAL)
-                            #------------------------------
+                        uncertainty_from = {'par1': entry6.get(), 'par2': entry7.get(), 'salinity': entry8.get(),
+                                            'temperature': entry9.get(), 'pressure': entry10.get()}
 
-    # ----- Buttons -----
-                        clr_results = Button(root, text = 'Clear Results', command = back_3, background='brown', foreground = 'white', width=10)
-                        canvas4.create_window(150, 150, window = clr_results)
+                        def sweep_job():
+                            tidy = sweep.sweep_sample(entry1.get(), entry2.get(), par1_type, par2_type, entry3.get(),
+                                                      entry4.get(), entry5.get(), uncertainty_from)
+                            batch.write_table(tidy, out_path)
+                            return len(tidy), sweep.summarize(tidy).iloc[0]
+
+                        def show_spread(result):
+                            n_combos, spread = result
+                            canvas4.delete('all'), busy.destroy()
+
+                            lines = [f'    {pars[i]}: {spread[code + "_min"]:.4g} – {spread[code + "_max"]:.4g}    '
+                                     for i, code in enumerate(batch.par_codes)]
+                            lbl20 = Label(root, text='\n    Spread over ' + f'{n_combos} constant sets:\n' + '\n'.join(lines) + '\n',
+                                          justify='left', relief='solid')
+                            lbl20.config(font=('Segoe UI', 10)), canvas4.create_window(150, 75, window = lbl20)
+
+                            clr_results = Button(root, text = 'Clear Results', command = back_4, background='brown', foreground = 'white', width=10)
+                            canvas4.create_window(150, 150, window = clr_results)
+
+                        def show_error(error):
+                            canvas4.delete('all'), busy.destroy()
+
+                            lbl20 = Label(root, text=f'\n    Sweep failed: {error}    \n', relief='solid')
+                            lbl20.config(font=('Segoe UI', 10)), canvas4.create_window(150, 75, window = lbl20)
+
+                            clr_results = Button(root, text = 'Clear Results', command = back_4, background='brown', foreground = 'white', width=10)
+                            canvas4.create_window(150, 150, window = clr_results)
+
+                        busy = ttk.Progressbar(root, mode='indeterminate', length=200)
+                        busy.start(10), canvas4.create_window(150, 75, window = busy)
+
+                        run_in_background(sweep_job, show_spread, show_error)
             
                 get_ins = Button(root, text = 'Get Results', command = get_vals, background='green', foreground = 'white', width=10)
                 canvas3.create_window(250, 190, window = get_ins)
                 back2 = Button(root, text = 'Back', command = back_2, background='brown', foreground = 'white', width=10)
                 canvas3.create_window(350, 190, window = back2)
+                sweep_btn = Button(root, text = 'Sweep Sets', command = sweep_sets, background='orange', width=10)
+                canvas3.create_window(450, 190, window = sweep_btn)
 
             next_consts = Button(root, text = 'Next', command = consts, background='green', foreground = 'white', width=10)
             canvas2.create_window(250, 125, window=next_consts)
@@ -387,6 +648,41 @@ if __name__ == '__main__':
     instructions = Button(root, text='Instructions', command=inst, background='orange', width=10)
     canvas5.create_window(600, 20, window = instructions)
 
+    export = Button(root, text='Export History', command=export_hist, background='orange', width=12)
+    canvas5.create_window(480, 20, window = export)
+
+    batch_btn = Button(root, text='Batch File...', command=run_batch, background='orange', width=12)
+    canvas5.create_window(360, 20, window = batch_btn)
+
+    batch_bar = ttk.Progressbar(root, mode='determinate', length=150)
+    canvas5.create_window(410, 45, window = batch_bar)
+
+    cancel_batch = Button(root, text='Cancel', state=DISABLED, background='brown', foreground = 'white', width=8)
+    canvas5.create_window(540, 45, window = cancel_batch)
+
+    root.protocol('WM_DELETE_WINDOW', close)
+
+    # ----- Show the window first, then warm up the solver in the background while inputs are filled in -----
+    root.update()
+    startup.append(('build and show window', time.perf_counter()))
+
+    def warm_up():
+        deferred = batch.warm_up()
+        if args.profile_startup:
+            start = time.perf_counter()
+            import openpyxl
+            deferred['import openpyxl'] = time.perf_counter() - start
+        return deferred
+
+    def warm_up_done(deferred):
+        if args.profile_startup:
+            print_startup(startup, deferred)
+
+    def warm_up_failed(error):
+        status.config(text=f'Solver warm-up failed: {error}')
+
+    run_in_background(warm_up, warm_up_done, warm_up_failed)
+
 
     # ----- Infinite loop to keep window running -----
     root.mainloop()
\ No newline at end of file
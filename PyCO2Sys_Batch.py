@@ -0,0 +1,483 @@
+import argparse
+import importlib
+import os
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PyCO2Sys_Results import ResultTable
+from PyCO2Sys_Timing import enable_log, profiled, timer
+from PyCO2Sys_Validate import plain_report, quarantine_rows, validate_table
+
+# ----- Batch Usage -----
+# Solve a whole table of samples in one vectorized CO2Sys call, no display required:
+#     python PyCO2Sys_Batch.py input.csv output.csv --par1-type 1 --par2-type 2
+# Files too large for memory can be streamed through in row chunks with --chunksize, e.g. --chunksize 100000
+# Rows (or chunks) are sharded across a process pool with --workers, e.g. --workers 32
+# Input/output files may be .csv, .parquet or .arrow (uncompressed Arrow IPC, memory-mapped on read). Column names default to the keys of default_columns
+# and can be remapped with --map, e.g. --map salinity=SAL --map temperature=TEMP
+# Parameter types follow the GUI checkbar order: 1 Total Alkalinity, 2 DIC, 3 pH, 4 pCO2
+# Rows with missing, non-numeric or unphysical inputs are not solved but written to --quarantine (default
+# output.quarantine.<ext>, same format as the output) with the reason; --report writes every problem found, including constant-set range warnings
+
+par_codes = ['alkalinity', 'dic', 'pH', 'pCO2']    # Parameter codes in CO2Sys
+
+# ----- Input keys (CO2Sys argument names) mapped to default column names -----
+default_columns = {'par1': 'par1', 'par2': 'par2', 'par1_type': 'par1_type', 'par2_type': 'par2_type',
+                   'salinity': 'salinity', 'temperature': 'temperature', 'pressure': 'pressure',
+                   'u_par1': 'u_par1', 'u_par2': 'u_par2', 'u_salinity': 'u_salinity',
+                   'u_temperature': 'u_temperature', 'u_pressure': 'u_pressure'}
+
+uncertainty_keys = ['par1', 'par2', 'salinity', 'temperature', 'pressure']    # Inputs with ± errors
+
+# ----- Constant sets, in CO2Sys code order (code = position + 1) -----
+k_carbonic_opts = ['Roy et al. (1993)', 'Goyet & Poisson (1989)', 'Hansson (1973) refit by Dickson & Millero (1987)',
+                   'Mehrbach et al. (1973) refit by Dickson & Millero (1987)',
+                   'Hansson & Mehrbach refit by Dickson & Millero (1987)',
+                   'GEOSECS constants (NBS scale) from Mehrbach et al. (1973)',
+                   'Constants from Peng et al. (NBS scale) from Mehrbach et al. (1973)',
+                   'Millero (1979)', 'Cai & Wang (1998)', 'Lueker et al. (2000)', 'Mojica Prieto & Millero (2002)',
+                   'Millero et al. (2002)', 'Millero et al. (2006)', 'Millero (2010)', 'Waters et al. (2014)',
+                   'Sulphis et al. (2020)', 'Schockman & Byrne (2021)']
+k_bisulphate_opts = ['Dickson (1990)', 'Khoo et al. (1977)', 'Waters & Millero (2013) / Waters et al. (2014)']
+tot_borate_opts = ['Uppström (1974)', 'Lee et al. (2010)', 'Kuliński et al. (2018)']
+k_fluoride_opts = ['Dickson & Riley (1979)', 'Perez & Fraga (1987)']
+
+opt_names = {'opt_k_carbonic': k_carbonic_opts, 'opt_k_bisulfate': k_bisulphate_opts,
+             'opt_total_borate': tot_borate_opts, 'opt_k_fluoride': k_fluoride_opts}
+
+# ----- Default constant sets (CO2Sys codes, same defaults as the GUI dropdowns) -----
+default_opts = {'opt_k_carbonic': 16, 'opt_k_bisulfate': 1, 'opt_total_borate': 1, 'opt_k_fluoride': 1}
+
+default_outputs = par_codes + ['u_' + code for code in par_codes]
+
+
+# ----- PyCO2SYS (and its autograd stack) and pandas are heavy, so load them on first use -----
+def load_pyco2sys():
+    import PyCO2SYS as pyc02
+    return pyc02
+
+
+# ----- Import the heavy dependencies and run one small solve so the first real solve is fast -----
+def warm_up(modules=('pandas', 'PyCO2SYS')):
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[f'import {name}'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with timer.quiet():    # Keep the cold-start solve out of the rolling solve latencies
+        solve(2300, 2100, 1, 2, 35, 25, 0, {key: 0 for key in uncertainty_keys})
+    timings['first solve'] = time.perf_counter() - start
+    return timings
+
+
+# ----- Single CO2Sys call shared by the GUI and batch modes -----
+def solve(par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from=None,
+          uncertainty_into=par_codes, **opts):
+    opts = {**default_opts, **opts}
+    kwargs = {}
+    if uncertainty_from is not None:
+        kwargs['uncertainty_into'] = uncertainty_into
+        kwargs['uncertainty_from'] = {key: np.asarray(val, dtype=float) for key, val in uncertainty_from.items()}
+
+    pyc02 = load_pyco2sys()
+    # ----- PyCO2SYS propagates uncertainties inside the same call, so they are timed as their own stage name -----
+    with timer.stage('solve+uncertainty' if uncertainty_from is not None else 'solve', rows=int(np.size(par1))):
+        return pyc02.sys(np.asarray(par1, dtype=float), np.asarray(par2, dtype=float),
+                         np.asarray(par1_type, dtype=int), np.asarray(par2_type, dtype=int),
+                         salinity=np.asarray(salinity, dtype=float), temperature=np.asarray(temperature, dtype=float),
+                         pressure=np.asarray(pressure, dtype=float), **opts, **kwargs)
+
+
+# ----- LRU cache of scalar solves keyed on inputs, uncertainties, outputs and constant sets -----
+class SolveCache:
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize, self.path = maxsize, path
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()    # A cancelled GUI solve can still be running while the next one starts
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def key(par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from=None,
+            outputs=default_outputs, **opts):
+        opts = {**default_opts, **opts}
+        with_u, uncertainty_from = uncertainty_from is not None, uncertainty_from or {}
+        return (float(par1), float(par2), int(par1_type), int(par2_type), float(salinity), float(temperature),
+                float(pressure), with_u, *(float(uncertainty_from.get(key, 0)) for key in uncertainty_keys),
+                tuple(outputs), *(int(opts[key]) for key in sorted(opts)))
+
+    def solve(self, par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from=None,
+              outputs=default_outputs, **opts):
+        key = self.key(par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from, outputs,
+                       **opts)
+        start = time.perf_counter()
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            else:
+                self.misses += 1
+        if cached is not None:
+            timer.record('cache_hit', time.perf_counter() - start)
+            return cached
+
+        co2sys = solve(par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from, **opts)
+        result = {out: float(co2sys[out]) for out in outputs if out in co2sys}
+        with self.lock:
+            self.entries[key] = result
+            self.trim()
+        return result
+
+    def trim(self):
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)    # Evict least recently used
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+    # ----- Kept as JSON; an unreadable file (e.g. truncated by a crash) just starts an empty cache -----
+    def load(self):
+        def as_tuple(value):
+            return tuple(as_tuple(item) for item in value) if isinstance(value, list) else value
+        try:
+            with open(self.path) as f:
+                self.entries.update((as_tuple(key), result) for key, result in json.load(f))
+        except (OSError, ValueError, TypeError):
+            self.entries.clear()
+        self.trim()    # The file may come from a run with a larger maxsize
+
+    def save(self):
+        if self.path is not None:
+            temp_path = f'{self.path}.tmp'
+            with self.lock, open(temp_path, 'w') as f:
+                json.dump(list(self.entries.items()), f)
+            os.replace(temp_path, self.path)    # Atomic, so a crash never leaves a partial cache file
+
+
+# ----- Read/write tabular files by extension -----
+def file_format(path):
+    if str(path).lower().endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if str(path).lower().endswith(('.arrow', '.feather')):
+        return 'arrow'
+    return 'csv'
+
+
+def read_table(path):
+    import pandas as pd
+    if file_format(path) == 'parquet':
+        return pd.read_parquet(path)
+    if file_format(path) == 'arrow':
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_csv(path)
+
+
+def write_table(df, path):
+    import pandas as pd
+    if file_format(path) == 'parquet':
+        df.to_parquet(path, index=False)
+    elif file_format(path) == 'arrow':
+        df.reset_index(drop=True).to_feather(path, compression='uncompressed')    # Uncompressed to allow mmap
+    else:
+        df.to_csv(path, index=False)
+
+
+# ----- Pull solver inputs out of a table as arrays -----
+def table_inputs(df, columns=None, par1_type=None, par2_type=None):
+    columns = {**default_columns, **(columns or {})}
+    inputs = {}
+
+    for key in ['par1', 'par2', 'salinity', 'temperature', 'pressure']:
+        if columns[key] not in df:
+            raise KeyError(f'Input column "{columns[key]}" for {key} not found')
+        inputs[key] = df[columns[key]].to_numpy(dtype=float)
+
+    # ----- Parameter types: a fixed code for the whole file or a per-row column -----
+    for key, code in [('par1_type', par1_type), ('par2_type', par2_type)]:
+        if code is not None:
+            inputs[key] = np.full(len(df), code, dtype=int)
+        elif columns[key] in df:
+            inputs[key] = df[columns[key]].to_numpy(dtype=int)
+        else:
+            raise KeyError(f'No {key} given and column "{columns[key]}" not found')
+
+    # ----- Missing uncertainty columns count as zero error -----
+    inputs['uncertainty_from'] = {key: df[columns['u_' + key]].to_numpy(dtype=float) if columns['u_' + key] in df
+                                  else np.zeros(len(df)) for key in uncertainty_keys}
+    return inputs
+
+
+# ----- Parse and check inputs in one vectorized pass; rows with errors are quarantined instead of solved -----
+def split_valid(df, columns=None, par1_type=None, par2_type=None, **opts):
+    columns = {**default_columns, **(columns or {})}
+    parsed, valid, report = validate_table(df, columns, par1_type, par2_type,
+                                           opts.get('opt_k_carbonic', default_opts['opt_k_carbonic']))
+
+    # ----- Measured values are always float, so every chunk (whole numbers or not) has the same output schema -----
+    measured = [columns[key] for key in ['par1', 'par2', 'salinity', 'temperature', 'pressure']] + \
+               [columns['u_' + key] for key in uncertainty_keys]
+    good = parsed[valid].astype({column: float for column in measured if column in parsed})
+    return good, quarantine_rows(df, valid, report), report
+
+
+def default_quarantine_path(out_path):
+    root, ext = os.path.splitext(str(out_path))
+    return f'{root}.quarantine{ext}'
+
+
+# ----- Collapse duplicate rows (e.g. replicate CRMs) so each distinct sample is solved once -----
+def dedupe_inputs(inputs):
+    keys = ['par1', 'par2', 'par1_type', 'par2_type', 'salinity', 'temperature', 'pressure']
+    matrix = np.column_stack([inputs[key] for key in keys] +
+                             [inputs['uncertainty_from'][key] for key in uncertainty_keys]
+                             if 'uncertainty_from' in inputs else [inputs[key] for key in keys])
+    _, first, inverse = np.unique(matrix, axis=0, return_index=True, return_inverse=True)
+    if len(first) == len(matrix):
+        return inputs, None
+
+    unique = {key: inputs[key][first] for key in keys}
+    if 'uncertainty_from' in inputs:
+        unique['uncertainty_from'] = {key: val[first] for key, val in inputs['uncertainty_from'].items()}
+    return unique, inverse.ravel()
+
+
+# ----- Solve every row of a table in one vectorized call, keeping only the selected outputs -----
+def solve_results(df, columns=None, par1_type=None, par2_type=None, outputs=default_outputs, dedupe=True, **opts):
+    inputs = table_inputs(df, columns, par1_type, par2_type)
+    uncertainty_into = [out[2:] for out in outputs if out.startswith('u_')]
+    if not uncertainty_into:
+        inputs.pop('uncertainty_from')
+
+    inverse = None
+    if dedupe and len(df) > 1:
+        with timer.stage('dedupe', rows=len(df)):
+            inputs, inverse = dedupe_inputs(inputs)
+
+    co2sys = solve(**inputs, uncertainty_into=uncertainty_into, **opts)
+    results = ResultTable.from_co2sys(co2sys, outputs, len(inputs['par1']))
+    del co2sys    # Release the unselected PyCO2SYS arrays straight away
+    if inverse is not None:
+        results = results.take(inverse)    # Scatter back to every duplicate
+    return results
+
+
+def solve_table(df, columns=None, par1_type=None, par2_type=None, outputs=default_outputs, dedupe=True, **opts):
+    return solve_results(df, columns, par1_type, par2_type, outputs, dedupe, **opts).to_pandas(index=df.index)
+
+
+# ----- Parallel: shard rows across a process pool, each worker runs the vectorized solve -----
+def solve_table_parallel(df, workers=None, columns=None, par1_type=None, par2_type=None, outputs=default_outputs,
+                         **opts):
+    import pandas as pd
+    workers = workers or os.cpu_count()
+    if workers <= 1 or len(df) < 2:
+        return solve_table(df, columns, par1_type, par2_type, outputs, **opts)
+
+    shards = [df.iloc[idx] for idx in np.array_split(np.arange(len(df)), min(workers, len(df)))]
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(solve_table, shard, columns, par1_type, par2_type, outputs, **opts)
+                   for shard in shards]
+        return pd.concat([future.result() for future in futures])    # Submission order keeps the row order
+
+
+def solve_file(in_path, out_path, columns=None, par1_type=None, par2_type=None, outputs=default_outputs, workers=1,
+               quarantine_path=None, report_path=None, **opts):
+    import pandas as pd
+    df, bad, report = split_valid(read_table(in_path), columns, par1_type, par2_type, **opts)
+    results = solve_table_parallel(df, workers, columns, par1_type, par2_type, outputs, **opts)
+    write_table(pd.concat([df, results.add_prefix('out_')], axis=1), out_path)
+    if quarantine_path is not None and len(bad):
+        write_table(bad, quarantine_path)
+    if report_path is not None:
+        write_table(plain_report(report), report_path)
+    return len(df), len(bad)    # (rows solved, rows quarantined)
+
+
+# ----- Streaming: read input in row chunks so memory stays flat for any file size -----
+def iter_chunks(path, chunksize):
+    if file_format(path) in ['parquet', 'arrow']:
+        if file_format(path) == 'parquet':
+            import pyarrow.parquet as pq
+            record_batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize)
+        else:
+            import pyarrow.feather as feather
+            record_batches = feather.read_table(path, memory_map=True).to_batches(max_chunksize=chunksize)
+        start = 0
+        for record_batch in record_batches:
+            chunk = record_batch.to_pandas()
+            chunk.index += start    # Row numbers continue across chunks, as for CSV
+            start += len(chunk)
+            yield chunk
+    else:
+        import pandas as pd
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def count_rows(path):
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    if file_format(path) == 'arrow':
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).num_rows
+    return None    # Unknown for CSV without reading the whole file
+
+
+# ----- Append solved chunks to the output as they are produced (a path of None discards them) -----
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self.format = file_format(path)
+        self.writer, self.schema = None, None
+        self.header = True
+
+    def write(self, df):
+        if self.path is None:
+            return
+        with timer.stage('write_chunk', rows=len(df)):
+            self.write_table(df)
+
+    def write_table(self, df):
+        if self.format in ['parquet', 'arrow']:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self.writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self.schema = table.schema
+                self.writer = (pq.ParquetWriter(self.path, self.schema) if self.format == 'parquet'
+                               else pa.ipc.new_file(str(self.path), self.schema))
+            else:
+                table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+            self.header = False
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def solve_chunk(chunk, columns=None, par1_type=None, par2_type=None, outputs=default_outputs, **opts):
+    import pandas as pd
+    chunk, bad, report = split_valid(chunk, columns, par1_type, par2_type, **opts)
+    results = solve_table(chunk, columns, par1_type, par2_type, outputs, **opts)
+    return pd.concat([chunk, results.add_prefix('out_')], axis=1), bad, report
+
+
+def solve_chunks(chunks, columns=None, par1_type=None, par2_type=None, outputs=default_outputs, workers=1, **opts):
+    if workers <= 1:
+        for chunk in chunks:
+            yield solve_chunk(chunk, columns, par1_type, par2_type, outputs, **opts)
+        return
+
+    # ----- Keep at most 2 chunks per worker in flight so memory stays bounded, yield in input order -----
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(solve_chunk, chunk, columns, par1_type, par2_type, outputs, **opts))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def solve_stream(in_path, out_path, chunksize=100000, columns=None, par1_type=None, par2_type=None,
+                 outputs=default_outputs, progress=None, workers=1, quarantine_path=None, report_path=None, **opts):
+    total, done, rejected = count_rows(in_path), 0, 0
+    with ChunkWriter(out_path) as writer, ChunkWriter(quarantine_path) as quarantine, \
+            ChunkWriter(report_path) as reports:
+        solved = solve_chunks(iter_chunks(in_path, chunksize), columns, par1_type, par2_type, outputs, workers,
+                              **opts)
+        for i, (chunk, bad, report) in enumerate(solved):
+            writer.write(chunk)
+            if len(bad):
+                quarantine.write(bad)
+            if len(report):
+                reports.write(plain_report(report))
+            done, rejected = done + len(chunk), rejected + len(bad)
+            if progress is not None:
+                progress(i + 1, done + rejected, total)    # (chunks done, rows done, total rows or None)
+    return done, rejected    # (rows solved, rows quarantined)
+
+
+def print_progress(n_chunks, done, total):
+    of_total = f'/{total}' if total is not None else ''
+    print(f'Chunk {n_chunks}: {done}{of_total} rows processed', file=sys.stderr)
+
+
+# ----- Command line interface -----
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Solve a table of carbonate system samples with PyCO2SYS')
+    parser.add_argument('input', help='Input .csv or .parquet file')
+    parser.add_argument('output', help='Output .csv or .parquet file (inputs plus out_ result columns)')
+    parser.add_argument('--par1-type', type=int, choices=range(1, 5), help='Parameter 1 code for every row')
+    parser.add_argument('--par2-type', type=int, choices=range(1, 5), help='Parameter 2 code for every row')
+    parser.add_argument('--map', action='append', default=[], metavar='KEY=COLUMN',
+                        help='Map an input key (e.g. salinity) to a column name')
+    parser.add_argument('--chunksize', type=int, help='Stream the input in chunks of this many rows')
+    parser.add_argument('--workers', type=int, default=1, help='Number of solver processes (0 = all cores)')
+    parser.add_argument('--timing-log', help='Append per-stage timings as JSON lines to this file')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='Profile the run')
+    parser.add_argument('--profile-output', help='Save the profile (.prof for cProfile, .html/.txt for pyinstrument)')
+    parser.add_argument('--outputs', nargs='+', default=default_outputs, help='CO2Sys result fields to write')
+    parser.add_argument('--quarantine', help='File for rows with invalid inputs (default: output.quarantine.<ext>, e.g. out.quarantine.parquet)')
+    parser.add_argument('--report', help='File listing every validation error and warning per row')
+    parser.add_argument('--opt-k-carbonic', type=int, default=default_opts['opt_k_carbonic'], choices=range(1, 18))
+    parser.add_argument('--opt-k-bisulfate', type=int, default=default_opts['opt_k_bisulfate'], choices=range(1, 4))
+    parser.add_argument('--opt-total-borate', type=int, default=default_opts['opt_total_borate'], choices=range(1, 4))
+    parser.add_argument('--opt-k-fluoride', type=int, default=default_opts['opt_k_fluoride'], choices=range(1, 3))
+    args = parser.parse_args(argv)
+
+    args.columns = {}
+    for pair in args.map:
+        key, _, column = pair.partition('=')
+        if key not in default_columns or not column:
+            parser.error(f'Invalid --map "{pair}", expected KEY=COLUMN with KEY in {list(default_columns)}')
+        args.columns[key] = column
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    opts = {key: getattr(args, key) for key in default_opts}
+    workers = args.workers or os.cpu_count()
+    if args.timing_log:
+        enable_log(args.timing_log)
+
+    quarantine_path = args.quarantine or default_quarantine_path(args.output)
+
+    with profiled(args.profile, args.profile_output):
+        if args.chunksize:
+            n_rows, n_bad = solve_stream(args.input, args.output, args.chunksize, args.columns, args.par1_type,
+                                         args.par2_type, args.outputs, print_progress, workers, quarantine_path,
+                                         args.report, **opts)
+        else:
+            n_rows, n_bad = solve_file(args.input, args.output, args.columns, args.par1_type, args.par2_type,
+                                       args.outputs, workers, quarantine_path, args.report, **opts)
+    print(f'Solved {n_rows} rows -> {args.output}')
+    if n_bad:
+        print(f'Quarantined {n_bad} rows with invalid inputs -> {quarantine_path}', file=sys.stderr)
+    if timer.stages():
+        print(timer.readout(), file=sys.stderr)    # Stages run in worker processes are not included
+
+
+if __name__ == '__main__':
+    main()
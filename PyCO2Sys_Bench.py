@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import PyCO2Sys_Batch as batch
+import PyCO2Sys_History as hist
+
+# ----- Benchmark Usage -----
+# Headless benchmarks of the solve and result-history paths, emitted as JSON for comparison between runs:
+#     python PyCO2Sys_Bench.py --output bench.json
+#     python PyCO2Sys_Bench.py --sizes 1 10 100 1000 --only solve uncertainty
+# Each timing is the best of --repeat runs, in seconds.
+
+suites = ['solve', 'uncertainty', 'carbonic', 'history']
+
+
+# ----- Random but realistic seawater samples, Total Alkalinity (1) and DIC (2) as the input pair -----
+def samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {'par1': rng.normal(2300, 30, n), 'par2': rng.normal(2100, 30, n), 'par1_type': np.full(n, 1),
+            'par2_type': np.full(n, 2), 'salinity': rng.uniform(30, 37, n), 'temperature': rng.uniform(0, 30, n),
+            'pressure': rng.uniform(0, 1000, n)}
+
+
+def errors(n):
+    return {'par1': np.full(n, 2.0), 'par2': np.full(n, 2.0), 'salinity': np.full(n, 0.01),
+            'temperature': np.full(n, 0.05), 'pressure': np.full(n, 1.0)}
+
+
+def best_of(repeat, func, *args, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# ----- pyc02.sys as get_vals() calls it: one sample per call vs one vectorized call -----
+def bench_solve(sizes, repeat, scalar_max):
+    results = []
+    for n in sizes:
+        inputs, u = samples(n), errors(n)
+        vector = best_of(repeat, batch.solve, **inputs, uncertainty_from=u)
+        row = {'n': n, 'vectorized_s': vector, 'vectorized_per_sample_s': vector / n}
+
+        if n <= scalar_max:
+            def scalar_loop():
+                for i in range(n):
+                    batch.solve(**{key: val[i] for key, val in inputs.items()},
+                                uncertainty_from={key: val[i] for key, val in u.items()})
+            scalar = best_of(repeat, scalar_loop)
+            row.update({'scalar_s': scalar, 'scalar_per_sample_s': scalar / n, 'speedup': scalar / vector})
+        results.append(row)
+    return results
+
+
+# ----- Extra cost of uncertainty_into/uncertainty_from propagation -----
+def bench_uncertainty(sizes, repeat):
+    results = []
+    for n in sizes:
+        inputs = samples(n)
+        plain = best_of(repeat, batch.solve, **inputs)
+        with_u = best_of(repeat, batch.solve, **inputs, uncertainty_from=errors(n))
+        results.append({'n': n, 'no_uncertainty_s': plain, 'uncertainty_s': with_u, 'overhead_ratio': with_u / plain})
+    return results
+
+
+# ----- Cost of each of the 17 K1/K2 constant sets -----
+def bench_carbonic(n, repeat):
+    inputs, u = samples(n), errors(n)
+    return [{'opt_k_carbonic': code, 'n': n,
+             'seconds': best_of(repeat, batch.solve, **inputs, uncertainty_from=u, opt_k_carbonic=code)}
+            for code in range(1, 18)]
+
+
+# ----- Cost of writing one result as the history grows: legacy xlsx insert_rows vs append-only store -----
+def bench_history(history_sizes, repeat):
+    import openpyxl as px
+    co2sys = {field: 1.0 for field in hist.result_fields}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in history_sizes:
+            xlsx_path = os.path.join(tmp, f'history_{n}.xlsx')
+            wb = px.Workbook()
+            page = wb.active
+            for _ in range(n):
+                page.append([datetime.now(), 1.0, 1.0, 1.0, 1.0, None, 1.0, 1.0, 1.0, 1.0])
+            wb.save(xlsx_path)
+
+            def legacy_write():
+                wb = px.load_workbook(xlsx_path)
+                page = wb.active
+                page.insert_rows(4, 1)
+                page['A4'], page['B4'] = datetime.now(), 1.0
+                wb.save(xlsx_path)
+
+            row = {'history_rows': n, 'xlsx_insert_rows_s': best_of(repeat, legacy_write)}
+            for ext in ['.sqlite', '.csv']:
+                store_path = os.path.join(tmp, f'history_{n}{ext}')
+                store = hist.open_history(store_path, buffer_size=1000)
+                for _ in range(n):
+                    store.append(hist.history_row(co2sys))
+                store.close()
+
+                store = hist.open_history(store_path, buffer_size=1)    # Flush every result, as the GUI does
+                row[f'{ext[1:]}_append_s'] = best_of(repeat, store.append, hist.history_row(co2sys))
+                store.close()
+            results.append(row)
+    return results
+
+
+def run(args):
+    pyc02 = batch.load_pyco2sys()
+    report = {'meta': {'timestamp': datetime.now().isoformat(), 'python': platform.python_version(),
+                       'platform': platform.platform(), 'numpy': np.__version__,
+                       'PyCO2SYS': getattr(pyc02, '__version__', 'unknown'), 'repeat': args.repeat}}
+
+    batch.warm_up()    # Keep import and first-call costs out of the timings
+    if 'solve' in args.only:
+        report['solve'] = bench_solve(args.sizes, args.repeat, args.scalar_max)
+    if 'uncertainty' in args.only:
+        report['uncertainty'] = bench_uncertainty(args.sizes, args.repeat)
+    if 'carbonic' in args.only:
+        report['carbonic'] = bench_carbonic(args.carbonic_n, args.repeat)
+    if 'history' in args.only:
+        report['history'] = bench_history(args.history_sizes, args.repeat)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark PyCO2Sys solve throughput and history writes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000, 100000, 1000000],
+                        help='Sample counts N for the solve and uncertainty suites')
+    parser.add_argument('--scalar-max', type=int, default=100, help='Largest N to time as a loop of scalar solves')
+    parser.add_argument('--carbonic-n', type=int, default=10000, help='Sample count for the constant-set suite')
+    parser.add_argument('--history-sizes', type=int, nargs='+', default=[0, 1000, 5000, 20000],
+                        help='Existing history lengths for the history-write suite')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per timing (best is reported)')
+    parser.add_argument('--only', nargs='+', choices=suites, default=suites, help='Suites to run')
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
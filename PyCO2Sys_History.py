@@ -0,0 +1,322 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+import PyCO2Sys_Batch as batch
+import PyCO2Sys_Validate as validate
+from PyCO2Sys_Timing import timer
+
+# ----- Result History Usage -----
+# Results are appended to an append-only store (SQLite by default, or CSV) in constant time per result.
+# The Excel history layout (timestamp in A, values in B-E, uncertainties in G-J, newest first from row 4)
+# is produced on demand:
+#     python PyCO2Sys_History.py export --store PyCO2Sys_Result_History.sqlite --xlsx PyCO2Sys_Result_History.xlsx
+# Each row also keeps the inputs and constant-set codes that produced it, plus a hash of them. Rows whose inputs
+# were edited in the store, or are changed with --set, are re-solved in one vectorized call; the rest are skipped:
+#     python PyCO2Sys_History.py recompute --set opt_k_carbonic=10 --where opt_k_carbonic=16
+# Changed rows are validated first; rows with invalid inputs, or that solve to NaN, are rejected and left as stored.
+
+result_fields = batch.default_outputs    # alkalinity, dic, pH, pCO2 and their u_ uncertainties
+int_fields = ['par1_type', 'par2_type'] + list(batch.default_opts)
+input_fields = (['par1', 'par2', 'par1_type', 'par2_type', 'salinity', 'temperature', 'pressure'] +
+                ['u_' + key for key in batch.uncertainty_keys] + list(batch.default_opts))
+history_fields = ['timestamp'] + result_fields + input_fields + ['input_hash']
+
+default_store = 'PyCO2Sys_Result_History.sqlite'
+default_xlsx = 'PyCO2Sys_Result_History.xlsx'
+
+
+# ----- Typed value for a field, None where a row has no value (e.g. imported from the old xlsx layout) -----
+# Raises ValueError for text that is not a number, or a code that is not a whole number
+def field_value(field, value):
+    if value is None or value == '':
+        return None
+    if field in ['timestamp', 'input_hash']:
+        return str(value)
+    if field not in int_fields:
+        return float(value)
+    if not float(value).is_integer():
+        raise ValueError(f'{field} must be a whole number, got {value}')
+    return int(float(value))
+
+
+def input_hash(row):
+    values = [field_value(field, row.get(field)) for field in input_fields]
+    if None in values:
+        return None
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()[:16]
+
+
+def history_row(co2sys, inputs=None, timestamp=None):
+    row = {'timestamp': (timestamp or datetime.now()).isoformat()}
+    for field in result_fields:
+        row[field] = float(co2sys[field])
+    for field in input_fields:
+        row[field] = field_value(field, (inputs or {}).get(field))
+    row['input_hash'] = input_hash(row)
+    return row
+
+
+# ----- SQLite backend (default) -----
+class SQLiteHistory:
+    def __init__(self, path=default_store, buffer_size=64):
+        self.path, self.buffer_size, self.buffer = path, buffer_size, []
+        self.lock = threading.RLock()    # The GUI appends and exports from different worker threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        types = {field: 'TEXT' if field in ['timestamp', 'input_hash'] else 'INTEGER' if field in int_fields
+                 else 'REAL' for field in history_fields}
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, "timestamp" TEXT)')
+
+        # ----- Add any columns missing from stores written by older versions -----
+        existing = [info[1] for info in self.conn.execute('PRAGMA table_info(history)')]
+        for field in history_fields:
+            if field not in existing:
+                self.conn.execute(f'ALTER TABLE history ADD COLUMN "{field}" {types[field]}')
+        self.conn.commit()
+
+    def append(self, row):
+        with self.lock:
+            self.buffer.append(tuple(row.get(field) for field in history_fields))
+            if len(self.buffer) >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.buffer:
+                placeholders = ', '.join('?' * len(history_fields))
+                names = ', '.join(f'"{field}"' for field in history_fields)
+                with timer.stage('history_write', rows=len(self.buffer)):
+                    self.conn.executemany(f'INSERT INTO history ({names}) VALUES ({placeholders})', self.buffer)
+                    self.conn.commit()
+                self.buffer = []
+
+    def rows(self):
+        with self.lock:
+            self.flush()
+            names = ', '.join(f'"{field}"' for field in history_fields)
+            cursor = self.conn.execute(f'SELECT id, {names} FROM history ORDER BY id')
+            return [dict(zip(['id'] + history_fields, values)) for values in cursor]
+
+    def update(self, rows):
+        with self.lock:
+            self.flush()
+            assignments = ', '.join(f'"{field}" = ?' for field in history_fields[1:])
+            self.conn.executemany(f'UPDATE history SET {assignments} WHERE id = ?',
+                                  [tuple(row[field] for field in history_fields[1:]) + (row['id'],) for row in rows])
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.conn.close()
+
+
+# ----- CSV backend -----
+class CSVHistory:
+    def __init__(self, path, buffer_size=64):
+        self.path, self.buffer_size, self.buffer = path, buffer_size, []
+        self.lock = threading.RLock()
+        if not os.path.exists(path):
+            self.write_all([])
+        else:
+            with open(path, newline='') as f:
+                header = next(csv.reader(f), [])
+            if header != history_fields:    # Older layout: rewrite once with the current columns
+                self.write_all(self.rows())
+
+    def write_all(self, rows):
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(history_fields)
+            writer.writerows([row.get(field) for field in history_fields] for row in rows)
+
+    def append(self, row):
+        with self.lock:
+            self.buffer.append([row.get(field) for field in history_fields])
+            if len(self.buffer) >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.buffer:
+                with timer.stage('history_write', rows=len(self.buffer)), open(self.path, 'a', newline='') as f:
+                    csv.writer(f).writerows(self.buffer)
+                self.buffer = []
+
+    def rows(self):
+        with self.lock:
+            self.flush()
+            with open(self.path, newline='') as f:
+                return [{'id': i, **{field: field_value(field, row.get(field)) for field in history_fields}}
+                        for i, row in enumerate(csv.DictReader(f))]
+
+    def update(self, rows):
+        updated = {row['id']: row for row in rows}
+        with self.lock:
+            self.write_all([updated.get(row['id'], row) for row in self.rows()])    # CSV can only be rewritten
+
+    def close(self):
+        self.flush()
+
+
+backends = {'.sqlite': SQLiteHistory, '.db': SQLiteHistory, '.csv': CSVHistory}
+
+
+def open_history(path=default_store, buffer_size=64):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in backends:
+        raise ValueError(f'Unsupported history store "{path}", expected one of {list(backends)}')
+    return backends[ext](path, buffer_size)
+
+
+# ----- Excel layout: import existing history, export on demand -----
+def import_xlsx(history, xlsx_path=default_xlsx):
+    import openpyxl as px
+    page = px.load_workbook(xlsx_path).active
+    rows = []
+    for values in page.iter_rows(min_row=4, max_col=10, values_only=True):
+        if values[0] is None:
+            continue
+        stamp = values[0].isoformat() if isinstance(values[0], datetime) else str(values[0])
+        rows.append(dict(zip(['timestamp'] + result_fields, [stamp, *values[1:5], *values[6:10]])))
+    for row in reversed(rows):    # Workbook is newest first, store is oldest first
+        history.append(row)
+    history.flush()
+    return len(rows)
+
+
+# ----- ISO timestamps are written as dates; text imported from an old workbook's column A is written unchanged -----
+def timestamp_value(stamp):
+    try:
+        return datetime.fromisoformat(stamp)
+    except (TypeError, ValueError):
+        return stamp
+
+
+def export_xlsx(history, xlsx_path=default_xlsx):
+    with timer.stage('history_export'):
+        write_xlsx(history.rows(), xlsx_path)
+
+
+def write_xlsx(rows, xlsx_path):
+    import openpyxl as px
+    if os.path.exists(xlsx_path):
+        wb = px.load_workbook(xlsx_path)
+        page = wb.active
+        if page.max_row >= 4:
+            page.delete_rows(4, page.max_row - 3)
+    else:
+        wb = px.Workbook()
+        page = wb.active
+        page['A1'] = 'PyCO2Sys Result History'
+        page.append([])
+        page.append(['Time', 'Total Alkalinity (μmol·kg−1)', 'DIC (μmol·kg−1)', 'pH', 'pCO2 (μatm)', None,
+                     'u_Total Alkalinity', 'u_DIC', 'u_pH', 'u_pCO2'])
+
+    for i, row in enumerate(reversed(rows)):    # Newest first from row 4
+        page.cell(4 + i, 1, timestamp_value(row['timestamp']))
+        for col, field in zip([2, 3, 4, 5, 7, 8, 9, 10], result_fields):
+            page.cell(4 + i, col, row[field])
+    wb.save(xlsx_path)
+
+
+# ----- Mask of rows with invalid inputs or constant-set codes, in the columns of changed history rows -----
+def invalid_inputs(columns):
+    values = {key: columns[key].astype(float) for key in validate.value_keys}
+    values.update({'u_' + key: columns['u_' + key].astype(float) for key in validate.uncertainty_keys})
+    issues = validate.check_values(values, [columns['par1_type'], columns['par2_type']], columns['opt_k_carbonic'])
+    invalid = np.zeros(len(columns['par1']), dtype=bool)
+    for rows, _, _, severity in issues:
+        if severity == 'error':
+            invalid[rows] = True
+    for key, names in batch.opt_names.items():
+        invalid |= (columns[key] < 1) | (columns[key] > len(names))
+    return invalid
+
+
+# ----- Re-solve only rows whose inputs or constant sets changed, as one vectorized call -----
+# Returns the number of rows recomputed, skipped (unchanged or filtered out) and rejected (invalid or NaN results)
+def recompute(history, overrides=None, where=None):
+    overrides, where = overrides or {}, where or {}
+    changed, skipped = [], 0
+    for row in history.rows():
+        if row['input_hash'] is None or any(row[field] != field_value(field, value) for field, value in where.items()):
+            skipped += 1    # No stored inputs (e.g. imported from xlsx) or filtered out
+            continue
+        new = {**row, **{field: field_value(field, value) for field, value in overrides.items()}}
+        if input_hash(new) == row['input_hash']:
+            skipped += 1
+            continue
+        changed.append(new)
+
+    rejected = 0
+    if changed:
+        columns = {field: np.array([row[field] for row in changed]) for field in input_fields}
+        invalid = invalid_inputs(columns)
+        rejected = int(invalid.sum())
+        changed = [row for row, bad in zip(changed, invalid) if not bad]
+        columns = {field: values[~invalid] for field, values in columns.items()}
+    if changed:
+        co2sys = batch.solve(*(columns[key] for key in ['par1', 'par2', 'par1_type', 'par2_type', 'salinity',
+                                                        'temperature', 'pressure']),
+                             uncertainty_from={key: columns['u_' + key] for key in batch.uncertainty_keys},
+                             **{key: columns[key] for key in batch.default_opts})
+        results = {field: np.broadcast_to(co2sys[field], len(changed)).astype(float) for field in result_fields}
+        solved = ~np.any([np.isnan(values) for values in results.values()], axis=0)
+        for i, row in enumerate(changed):
+            row.update({field: float(results[field][i]) for field in result_fields})
+            row['input_hash'] = input_hash(row)
+        rejected += int((~solved).sum())
+        changed = [row for row, ok in zip(changed, solved) if ok]
+        history.update(changed)
+    return len(changed), skipped, rejected
+
+
+def parse_assignments(pairs, parser):
+    assignments = {}
+    for pair in pairs:
+        field, _, value = pair.partition('=')
+        if field not in input_fields or not value:
+            parser.error(f'Invalid "{pair}", expected FIELD=VALUE with FIELD in {input_fields}')
+        try:
+            assignments[field] = field_value(field, value)
+        except ValueError:
+            kind = 'a whole-number code' if field in int_fields else 'a number'
+            parser.error(f'Invalid "{pair}", {field} must be {kind}')
+    return assignments
+
+
+# ----- Command line interface -----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the PyCO2Sys result history')
+    parser.add_argument('command', choices=['export', 'import', 'recompute'],
+                        help='export the store to xlsx, import an xlsx, or re-solve changed rows')
+    parser.add_argument('--store', default=default_store, help='History store (.sqlite, .db or .csv)')
+    parser.add_argument('--xlsx', default=default_xlsx, help='Excel history workbook')
+    parser.add_argument('--set', action='append', default=[], metavar='FIELD=VALUE',
+                        help='recompute: change an input or constant-set code, e.g. opt_k_carbonic=10')
+    parser.add_argument('--where', action='append', default=[], metavar='FIELD=VALUE',
+                        help='recompute: only apply to rows with this input value, e.g. opt_k_carbonic=16')
+    args = parser.parse_args(argv)
+    overrides, where = parse_assignments(args.set, parser), parse_assignments(args.where, parser)
+
+    history = open_history(args.store)
+    if args.command == 'export':
+        export_xlsx(history, args.xlsx)
+        print(f'Exported {args.store} -> {args.xlsx}')
+    elif args.command == 'recompute':
+        n_changed, n_skipped, n_rejected = recompute(history, overrides, where)
+        print(f'Recomputed {n_changed} rows, skipped {n_skipped} unchanged rows, '
+              f'rejected {n_rejected} rows with invalid inputs or results')
+    else:
+        print(f'Imported {import_xlsx(history, args.xlsx)} rows from {args.xlsx} -> {args.store}')
+    history.close()
+
+
+if __name__ == '__main__':
+    main()
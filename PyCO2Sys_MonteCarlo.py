@@ -0,0 +1,91 @@
+import argparse
+import warnings
+import numpy as np
+import PyCO2Sys_Batch as batch
+
+# ----- Monte Carlo Uncertainty Usage -----
+# Alternative to the linear (finite-difference) uncertainty_from propagation: each sample is perturbed K times
+# with normal noise from its u_ columns (1 sigma), all copies are solved in vectorized blocks and the full
+# output distribution is summarized per sample:
+#     python PyCO2Sys_MonteCarlo.py input.csv mc.csv --par1-type 1 --par2-type 2 --draws 1000
+# Memory is bounded by --max-rows: at most max_rows (samples x draws) are solved at once. When draws > max_rows,
+# each sample's draws are solved in slices and only the summarized outputs are kept for its statistics.
+
+default_percentiles = [2.5, 16, 50, 84, 97.5]
+nonnegative = ['salinity', 'pressure']    # Perturbed values are clipped at zero
+
+
+# ----- Draw K perturbed copies of each sample in a block, flattened sample-major -----
+def perturb(inputs, idx, draws, rng):
+    n_samples = len(inputs['par1'][idx])
+    perturbed = {}
+    for key in batch.uncertainty_keys:
+        base, u = inputs[key][idx][:, None], inputs['uncertainty_from'][key][idx][:, None]
+        values = base + rng.standard_normal((n_samples, draws)) * u
+        perturbed[key] = np.maximum(values, 0).ravel() if key in nonnegative else values.ravel()
+    for key in ['par1_type', 'par2_type']:
+        perturbed[key] = np.repeat(inputs[key][idx], draws)
+    return perturbed
+
+
+def monte_carlo(df, columns=None, par1_type=None, par2_type=None, draws=1000, outputs=batch.par_codes,
+                percentiles=default_percentiles, max_rows=200000, seed=None, **opts):
+    import pandas as pd
+    inputs = batch.table_inputs(df, columns, par1_type, par2_type)
+    rng = np.random.default_rng(seed)
+    n_samples = len(df)
+    block = max(1, max_rows // draws)    # Samples per solve so that block * draws <= max_rows
+    draw_block = min(draws, max_rows)    # Draws per solve when one sample's draws exceed max_rows
+
+    stats = {f'{out}_{stat}': np.full(n_samples, np.nan) for out in outputs
+             for stat in ['mean', 'std'] + [f'p{pct:g}' for pct in percentiles]}
+    for start in range(0, n_samples, block):
+        idx = slice(start, min(start + block, n_samples))
+        n_block = idx.stop - idx.start
+        kept = {out: np.empty((n_block, draws)) for out in outputs}    # Only the summarized outputs
+        for first in range(0, draws, draw_block):
+            n_draws = min(draw_block, draws - first)
+            co2sys = batch.solve(**perturb(inputs, idx, n_draws, rng), **opts)
+            for out in outputs:
+                values = np.broadcast_to(co2sys[out], n_block * n_draws).reshape(n_block, n_draws)
+                kept[out][:, first:first + n_draws] = values
+            del co2sys    # Release the full PyCO2SYS result before the next slice
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)    # Samples with no valid solution stay NaN
+            for out in outputs:
+                values = kept[out]
+                stats[f'{out}_mean'][idx] = np.nanmean(values, axis=1)
+                stats[f'{out}_std'][idx] = np.nanstd(values, axis=1, ddof=1)
+                for pct, values_pct in zip(percentiles, np.nanpercentile(values, percentiles, axis=1)):
+                    stats[f'{out}_p{pct:g}'][idx] = values_pct
+    return pd.DataFrame(stats, index=df.index)
+
+
+# ----- Command line interface -----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo uncertainty propagation through PyCO2SYS')
+    parser.add_argument('input', help='Input .csv or .parquet file (same columns as PyCO2Sys_Batch.py)')
+    parser.add_argument('output', help='Output file with inputs plus mc_ statistic columns')
+    parser.add_argument('--par1-type', type=int, choices=range(1, 5), help='Parameter 1 code for every row')
+    parser.add_argument('--par2-type', type=int, choices=range(1, 5), help='Parameter 2 code for every row')
+    parser.add_argument('--draws', type=int, default=1000, help='Perturbed copies per sample (K)')
+    parser.add_argument('--outputs', nargs='+', default=batch.par_codes, help='CO2Sys result fields to summarize')
+    parser.add_argument('--percentiles', type=float, nargs='+', default=default_percentiles)
+    parser.add_argument('--max-rows', type=int, default=200000, help='Largest samples x draws block solved at once')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible draws')
+    for key, default in batch.default_opts.items():
+        parser.add_argument('--' + key.replace('_', '-'), type=int, default=default,
+                            choices=range(1, len(batch.opt_names[key]) + 1))
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    df = batch.read_table(args.input)
+    opts = {key: getattr(args, key) for key in batch.default_opts}
+    stats = monte_carlo(df, None, args.par1_type, args.par2_type, args.draws, args.outputs, args.percentiles,
+                        args.max_rows, args.seed, **opts)
+    batch.write_table(pd.concat([df, stats.add_prefix('mc_')], axis=1), args.output)
+    print(f'Solved {len(df)} samples x {args.draws} draws -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
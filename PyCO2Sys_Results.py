@@ -0,0 +1,71 @@
+import numpy as np
+
+# ----- Compact Columnar Results -----
+# PyCO2SYS returns a dict of ~140 arrays per solve. ResultTable keeps only the selected outputs as contiguous
+# NumPy columns and drops the rest, exports to Arrow/Parquet without copying, and memory-maps saved results:
+#     results = batch.solve_results(df, outputs=['pH', 'pCO2', 'u_pH', 'u_pCO2'])
+#     results.save('results.arrow')
+#     results = ResultTable.load('results.arrow')    # Memory-mapped, columns are read-only views of the file
+
+
+class ResultTable:
+    def __init__(self, columns):
+        self.columns = dict(columns)
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns have different lengths: {sorted(lengths)}')
+        self.n_rows = lengths.pop() if lengths else 0
+
+    # ----- Keep only the requested outputs from a PyCO2SYS result dict, broadcasting scalars to n_rows -----
+    @classmethod
+    def from_co2sys(cls, co2sys, outputs, n_rows):
+        missing = [out for out in outputs if out not in co2sys]
+        if missing:
+            raise KeyError(f'Outputs not in PyCO2SYS results: {missing}')
+        return cls({out: np.ascontiguousarray(np.broadcast_to(co2sys[out], n_rows), dtype=float) for out in outputs})
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def select(self, outputs):
+        return ResultTable({out: self.columns[out] for out in outputs})
+
+    def take(self, idx):
+        return ResultTable({name: values[idx] for name, values in self.columns.items()})
+
+    # ----- Export: numeric NumPy columns are wrapped by Arrow without copying -----
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.Table.from_arrays([pa.array(values) for values in self.columns.values()], names=self.names)
+
+    def to_pandas(self, index=None):
+        import pandas as pd
+        return pd.DataFrame(self.columns, index=index, copy=False)
+
+    def to_parquet(self, path):
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    # ----- Arrow IPC file, uncompressed so it can be memory-mapped back -----
+    def save(self, path):
+        import pyarrow as pa
+        table = self.to_arrow()
+        with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        import pyarrow as pa
+        source = pa.memory_map(str(path), 'r') if mmap else pa.OSFile(str(path), 'rb')
+        table = pa.ipc.open_file(source).read_all()
+        return cls({name: table.column(name).to_numpy() for name in table.column_names})
@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import PyCO2Sys_Batch as batch
+import PyCO2Sys_Validate as validate
+
+# ----- Solve Service Usage -----
+# Long-running local HTTP/JSON service around the same solve as the GUI:
+#     python PyCO2Sys_Server.py --port 8765 --workers 2
+#     curl -X POST localhost:8765/solve -d '{"par1": 2300, "par2": 2100, "par1_type": 1, "par2_type": 2,
+#          "salinity": 35, "temperature": 25, "pressure": 0, "uncertainty_from": {"par1": 2, "par2": 2}}'
+#     curl localhost:8765/health
+# Concurrent requests arriving within --window-ms are micro-batched into one vectorized solve on warm worker
+# processes. When --queue-size requests are already waiting, new requests get 503 (retry later).
+
+required_keys = ['par1', 'par2', 'par1_type', 'par2_type']
+input_defaults = {'salinity': 35, 'temperature': 25, 'pressure': 0}
+
+
+# ----- Runs in the worker processes: import PyCO2SYS and solve once so requests never pay the warm-up -----
+def init_worker():
+    batch.warm_up(modules=('PyCO2SYS',))
+
+
+def solve_requests(samples, outputs):
+    arrays = {key: np.array([sample[key] for sample in samples]) for key in required_keys + list(input_defaults)}
+    for key in batch.default_opts:
+        arrays[key] = np.array([sample[key] for sample in samples])
+    uncertainty_into = [out[2:] for out in outputs if out.startswith('u_')]
+    if uncertainty_into:
+        arrays['uncertainty_from'] = {key: np.array([sample['uncertainty_from'].get(key, 0) for sample in samples])
+                                      for key in batch.uncertainty_keys}
+
+    co2sys = batch.solve(**arrays, uncertainty_into=uncertainty_into)
+    columns = {out: np.broadcast_to(co2sys[out], len(samples)).tolist() for out in outputs}
+    return [{out: columns[out][i] for out in outputs} for i in range(len(samples))]
+
+
+def whole_number(key, value):
+    value = float(value)
+    if not value.is_integer():
+        raise ValueError(f'{key} must be a whole number')
+    return int(value)
+
+
+# ----- Validate one JSON request body into a flat sample -----
+def parse_sample(body):
+    if not isinstance(body, dict):
+        raise ValueError('Request body must be a JSON object')
+    missing = [key for key in required_keys if key not in body]
+    if missing:
+        raise ValueError(f'Missing fields: {missing}')
+
+    sample = {key: float(body[key]) for key in ['par1', 'par2']}
+    sample.update({key: whole_number(key, body[key]) for key in ['par1_type', 'par2_type']})
+    sample.update({key: float(body.get(key, default)) for key, default in input_defaults.items()})
+    sample.update({key: whole_number(key, body.get(key, default)) for key, default in batch.default_opts.items()})
+    for key in ['par1_type', 'par2_type']:
+        if sample[key] not in range(1, 5):
+            raise ValueError(f'{key} must be 1-4')
+    for key, names in batch.opt_names.items():
+        if sample[key] not in range(1, len(names) + 1):
+            raise ValueError(f'{key} must be 1-{len(names)}')
+
+    uncertainty_from = body.get('uncertainty_from')
+    if uncertainty_from is not None:
+        unknown = set(uncertainty_from) - set(batch.uncertainty_keys)
+        if unknown:
+            raise ValueError(f'Unknown uncertainty_from keys: {sorted(unknown)}')
+        uncertainty_from = {key: float(val) for key, val in uncertainty_from.items()}
+    sample['uncertainty_from'] = uncertainty_from
+
+    # ----- Same checks as batch mode, so a sample that would make the solve raise never joins a batch -----
+    values = {key: sample[key] for key in validate.value_keys}
+    values.update({'u_' + key: val for key, val in (uncertainty_from or {}).items()})
+    errors = [f'{field} {problem}' for field, problem, severity in
+              validate.check_sample(values, sample['par1_type'], sample['par2_type'], sample['opt_k_carbonic'])
+              if severity == 'error']
+    if errors:
+        raise ValueError('; '.join(errors))
+    return sample
+
+
+class SolveService:
+    def __init__(self, workers=2, window_ms=5, max_batch=1024, queue_size=4096):
+        self.workers, self.window, self.max_batch = workers, window_ms / 1000, max_batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.pool = ProcessPoolExecutor(workers, initializer=init_worker)
+        self.in_flight = asyncio.Semaphore(workers)
+        self.latencies = deque(maxlen=10000)
+        self.counts = {'requests': 0, 'rejected': 0, 'batches': 0, 'errors': 0}
+
+    # ----- Start the worker processes now; each one warms up once, in init_worker -----
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers)))
+        self.batcher = asyncio.create_task(self.run_batcher())
+
+    async def stop(self):
+        self.batcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    # ----- Queue a sample and wait for its result; raises QueueFull for backpressure -----
+    async def solve(self, sample):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((sample, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.counts['rejected'] += 1
+            raise
+        self.counts['requests'] += 1
+        return await future
+
+    # ----- Once a worker is free, collect requests for up to window seconds (or max_batch) into one solve -----
+    async def run_batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.in_flight.acquire()    # Requests keep queueing while all workers are busy
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self.run_batch(pending))
+
+    async def run_batch(self, pending):
+        try:
+            # ----- Samples with and without uncertainties are solved separately so only the former pay for it -----
+            for with_u in [True, False]:
+                group = [item for item in pending if (item[0]['uncertainty_from'] is not None) == with_u]
+                if not group:
+                    continue
+                outputs = batch.default_outputs if with_u else batch.par_codes
+                await self.solve_group(group, outputs, len(pending))
+            self.counts['batches'] += 1
+        finally:
+            self.in_flight.release()
+
+    # ----- If a group solve fails, split it in half and retry, so one bad sample cannot fail its neighbours -----
+    async def solve_group(self, group, outputs, batch_size):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, solve_requests, [item[0] for item in group], outputs)
+        except Exception as error:
+            if len(group) > 1:
+                half = len(group) // 2
+                await self.solve_group(group[:half], outputs, batch_size)
+                await self.solve_group(group[half:], outputs, batch_size)
+                return
+            self.counts['errors'] += 1
+            _, future, _ = group[0]
+            if not future.done():
+                future.set_exception(error)
+            return
+
+        now = time.perf_counter()
+        for (_, future, queued), result in zip(group, results):
+            latency = now - queued
+            self.latencies.append(latency)
+            result.update({'latency_ms': latency * 1000, 'batch_size': batch_size})
+            if not future.done():
+                future.set_result(result)
+
+    def health(self):
+        latencies = np.array(self.latencies) * 1000
+        percentiles = dict(zip(['p50_ms', 'p95_ms', 'p99_ms'], np.percentile(latencies, [50, 95, 99]).tolist())) \
+            if len(latencies) else {}
+        return {'status': 'ok', 'queue_depth': self.queue.qsize(), **self.counts, 'latency': percentiles}
+
+
+# ----- Minimal HTTP/1.1 handling, one request per connection -----
+async def read_request(reader):
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) < 2:
+        raise ValueError('Malformed request line')
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return request_line[0], request_line[1], body
+
+
+async def write_response(writer, status, payload):
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+    body = json.dumps(payload).encode()
+    extra = 'Retry-After: 1\r\n' if status == 503 else ''
+    writer.write(f'HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n{extra}Connection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+def make_handler(service):
+    async def handle(reader, writer):
+        try:
+            method, path, body = await read_request(reader)
+            if method == 'GET' and path == '/health':
+                return await write_response(writer, 200, service.health())
+            if method != 'POST' or path != '/solve':
+                return await write_response(writer, 404, {'error': f'No route for {method} {path}'})
+            sample = parse_sample(json.loads(body or b'null'))
+            result = await service.solve(sample)
+            await write_response(writer, 200, result)
+        except asyncio.QueueFull:
+            await write_response(writer, 503, {'error': 'Solve queue full, retry later'})
+        except (ValueError, TypeError) as error:    # Includes malformed JSON
+            await write_response(writer, 400, {'error': str(error)})
+        except Exception as error:
+            await write_response(writer, 500, {'error': str(error)})
+    return handle
+
+
+async def serve(host='127.0.0.1', port=8765, **service_options):
+    service = SolveService(**service_options)
+    await service.start()
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f'PyCO2Sys solve service listening on http://{host}:{port}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local HTTP/JSON PyCO2SYS solve service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help='Warm solver processes')
+    parser.add_argument('--window-ms', type=float, default=5, help='Micro-batching window')
+    parser.add_argument('--max-batch', type=int, default=1024, help='Largest number of requests per solve')
+    parser.add_argument('--queue-size', type=int, default=4096, help='Waiting requests before answering 503')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, window_ms=args.window_ms,
+                          max_batch=args.max_batch, queue_size=args.queue_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
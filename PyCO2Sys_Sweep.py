@@ -0,0 +1,140 @@
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import PyCO2Sys_Batch as batch
+
+# ----- Constant-Set Sweep Usage -----
+# Solve every sample against every combination (or a chosen subset) of K1/K2, KHSO4, total borate and HF
+# constant sets, 17 x 3 x 3 x 2 = 306 combinations by default:
+#     python PyCO2Sys_Sweep.py input.csv sweep.csv --par1-type 1 --par2-type 2 --summary spread.csv
+#     python PyCO2Sys_Sweep.py input.csv sweep.csv --par1-type 1 --par2-type 2 --opt-k-carbonic 10 14 16
+# Each (sample, combination) pair is one row of a broadcast solve, done in blocks of --block-rows rows.
+# Samples with invalid inputs are not swept but written to --quarantine with the reason, as in batch mode.
+
+sweep_keys = list(batch.opt_names)    # opt_k_carbonic, opt_k_bisulfate, opt_total_borate, opt_k_fluoride
+
+
+# ----- Cartesian product of the chosen constant-set codes -----
+def option_grid(subset=None):
+    subset = subset or {}
+    codes = [np.asarray(subset.get(key) or range(1, len(batch.opt_names[key]) + 1)) for key in sweep_keys]
+    mesh = np.meshgrid(*codes, indexing='ij')
+    return {key: grid.ravel() for key, grid in zip(sweep_keys, mesh)}
+
+
+# ----- One broadcast solve over a block of (sample, combination) rows, picklable for worker processes -----
+def solve_block(inputs, opts, outputs):
+    uncertainty_into = [out[2:] for out in outputs if out.startswith('u_')]
+    if not uncertainty_into:
+        inputs = {key: val for key, val in inputs.items() if key != 'uncertainty_from'}
+    co2sys = batch.solve(**inputs, uncertainty_into=uncertainty_into, **opts)
+    return batch.ResultTable.from_co2sys(co2sys, outputs, len(inputs['par1']))
+
+
+def take(inputs, idx):
+    taken = {key: val[idx] for key, val in inputs.items() if key != 'uncertainty_from'}
+    taken['uncertainty_from'] = {key: val[idx] for key, val in inputs['uncertainty_from'].items()}
+    return taken
+
+
+# ----- Solve a table against the option grid: (tidy table, one row per sample and combination; invalid samples) -----
+def sweep(df, columns=None, par1_type=None, par2_type=None, subset=None, outputs=batch.par_codes,
+          block_rows=100000, workers=1):
+    import pandas as pd
+    df, bad, _ = batch.split_valid(df, columns, par1_type, par2_type)
+    inputs = batch.table_inputs(df, columns, par1_type, par2_type)
+    grid = option_grid(subset)
+    n_samples, n_combos = len(df), len(grid[sweep_keys[0]])
+
+    sample_idx = np.repeat(np.arange(n_samples), n_combos)
+    combo_idx = np.tile(np.arange(n_combos), n_samples)
+    blocks = [slice(start, start + block_rows) for start in range(0, len(sample_idx), block_rows)]
+
+    def block_args(block):
+        return (take(inputs, sample_idx[block]), {key: grid[key][combo_idx[block]] for key in sweep_keys}, outputs)
+
+    if workers > 1 and len(blocks) > 1:
+        # ----- Build each block's inputs only when it is submitted, at most 2 blocks per worker in flight -----
+        solved, pending = [], deque()
+        with ProcessPoolExecutor(workers) as pool:
+            for block in blocks:
+                pending.append(pool.submit(solve_block, *block_args(block)))
+                if len(pending) >= 2 * workers:
+                    solved.append(pending.popleft().result())
+            while pending:
+                solved.append(pending.popleft().result())
+    else:
+        solved = [solve_block(*block_args(block)) for block in blocks]
+
+    tidy = pd.DataFrame({'sample': df.index.to_numpy()[sample_idx]})
+    for key in sweep_keys:
+        tidy[key] = grid[key][combo_idx]
+    for out in outputs:
+        tidy[out] = np.concatenate([block[out] for block in solved] or [np.array([])])
+    return tidy, bad
+
+
+# ----- Sweep a single sample, as entered in the GUI -----
+def sweep_sample(par1, par2, par1_type, par2_type, salinity, temperature, pressure, uncertainty_from=None,
+                 subset=None, outputs=batch.par_codes):
+    import pandas as pd
+    row = {'par1': par1, 'par2': par2, 'par1_type': par1_type, 'par2_type': par2_type, 'salinity': salinity,
+           'temperature': temperature, 'pressure': pressure}
+    row.update({'u_' + key: val for key, val in (uncertainty_from or {}).items()})
+    df = pd.DataFrame({key: [float(val)] for key, val in row.items()})
+    tidy, bad = sweep(df, subset=subset, outputs=outputs)
+    if len(bad):
+        raise ValueError(bad['errors'].iloc[0])
+    return tidy
+
+
+# ----- Spread of each output across constant sets, per sample -----
+def summarize(tidy, outputs=batch.par_codes):
+    import pandas as pd
+    stats = tidy.groupby('sample')[list(outputs)].agg(['mean', 'std', 'min', 'max'])
+    summary = pd.DataFrame(index=stats.index)
+    for out in outputs:
+        for stat in ['mean', 'std', 'min', 'max']:
+            summary[f'{out}_{stat}'] = stats[(out, stat)]
+        summary[f'{out}_range'] = stats[(out, 'max')] - stats[(out, 'min')]
+    return summary
+
+
+# ----- Command line interface -----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep samples across PyCO2SYS constant-set combinations')
+    parser.add_argument('input', help='Input .csv or .parquet file (same columns as PyCO2Sys_Batch.py)')
+    parser.add_argument('output', help='Tidy output table, one row per sample and constant-set combination')
+    parser.add_argument('--summary', help='Write the per-sample spread summary here')
+    parser.add_argument('--quarantine', help='File for samples with invalid inputs (default: output.quarantine.<ext>)')
+    parser.add_argument('--par1-type', type=int, choices=range(1, 5), help='Parameter 1 code for every row')
+    parser.add_argument('--par2-type', type=int, choices=range(1, 5), help='Parameter 2 code for every row')
+    parser.add_argument('--outputs', nargs='+', default=batch.par_codes, help='CO2Sys result fields to sweep')
+    for key in sweep_keys:
+        parser.add_argument('--' + key.replace('_', '-'), type=int, nargs='+',
+                            choices=range(1, len(batch.opt_names[key]) + 1), help='Codes to include (default: all)')
+    parser.add_argument('--block-rows', type=int, default=100000, help='Rows per broadcast solve')
+    parser.add_argument('--workers', type=int, default=1, help='Number of solver processes (0 = all cores)')
+    args = parser.parse_args(argv)
+
+    df = batch.read_table(args.input)
+    subset = {key: getattr(args, key) for key in sweep_keys}
+    tidy, bad = sweep(df, None, args.par1_type, args.par2_type, subset, args.outputs, args.block_rows,
+                      args.workers or os.cpu_count())
+    batch.write_table(tidy, args.output)
+    if len(bad):
+        quarantine_path = args.quarantine or batch.default_quarantine_path(args.output)
+        batch.write_table(bad, quarantine_path)
+        print(f'Quarantined {len(bad)} samples with invalid inputs -> {quarantine_path}', file=sys.stderr)
+    if args.summary:
+        summary = summarize(tidy, args.outputs)
+        batch.write_table(summary.reset_index(), args.summary)
+    n_swept = len(df) - len(bad)
+    print(f'Swept {n_swept} samples x {len(tidy) // max(n_swept, 1)} constant-set combinations -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
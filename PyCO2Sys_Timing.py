@@ -0,0 +1,147 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import numpy as np
+
+# ----- Stage Timing Usage -----
+# Each stage of the solve pipeline (validate, solve, history write, ...) is timed with
+#     with timer.stage('solve', rows=n):
+#         ...
+# and kept in a rolling window per stage for latency percentiles and histograms. Every stage is also logged as a
+# JSON record on the 'PyCO2Sys.timing' logger; enable_log('timing.jsonl') writes them to a file.
+# Stages of one caller can be kept apart from the rest under a prefix, e.g. the GUI's single-sample solves:
+#     with timer.prefixed('gui.'):    # Records 'gui.solve+uncertainty', not 'solve+uncertainty'
+# profiled('cprofile' or 'pyinstrument') wraps a run for a deeper dive.
+
+logger = logging.getLogger('PyCO2Sys.timing')
+
+
+class StageTimer:
+    def __init__(self, window=1000):
+        self.window = window
+        self.durations = defaultdict(lambda: deque(maxlen=self.window))
+        self.last = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, **fields)
+
+    # ----- Stages run inside quiet() on this thread are not recorded (e.g. the warm-up solve) -----
+    @contextmanager
+    def quiet(self):
+        self.local.quiet = True
+        try:
+            yield
+        finally:
+            self.local.quiet = False
+
+    # ----- Stages run inside prefixed() on this thread are recorded as prefix + name -----
+    @contextmanager
+    def prefixed(self, prefix):
+        outer = getattr(self.local, 'prefix', '')
+        self.local.prefix = outer + prefix
+        try:
+            yield
+        finally:
+            self.local.prefix = outer
+
+    def record(self, name, seconds, **fields):
+        if getattr(self.local, 'quiet', False):
+            return
+        name = getattr(self.local, 'prefix', '') + name
+        with self.lock:
+            self.durations[name].append(seconds)
+            self.last[name] = seconds
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'stage': name, 'seconds': seconds, 'time': time.time(), **fields}))
+
+    # ----- Rolling latency statistics and histogram per stage -----
+    def summary(self, name):
+        with self.lock:
+            values = np.array(self.durations[name])
+        if not len(values):
+            return {'count': 0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'count': len(values), 'last': self.last[name], 'mean': values.mean(), 'p50': p50, 'p95': p95,
+                'p99': p99, 'max': values.max()}
+
+    def histogram(self, name, bins=10):
+        with self.lock:
+            values = np.array(self.durations[name])
+        counts, edges = np.histogram(values, bins=bins) if len(values) else (np.array([]), np.array([]))
+        return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+    def stages(self):
+        with self.lock:
+            return list(self.durations)
+
+    def report(self):
+        return {name: self.summary(name) for name in self.stages()}
+
+    # ----- Compact one-line-per-stage text for the GUI, names shown without the prefix -----
+    def readout(self, names=None, prefix=''):
+        lines = []
+        for name in names or [stage[len(prefix):] for stage in self.stages() if stage.startswith(prefix)]:
+            stats = self.summary(prefix + name)
+            if stats['count']:
+                lines.append(f'{name}: {stats["last"] * 1000:.1f} ms (p50 {stats["p50"] * 1000:.1f}, '
+                             f'p95 {stats["p95"] * 1000:.1f}, n={stats["count"]})')
+        return '\n'.join(lines)
+
+
+timer = StageTimer()    # Shared by the GUI (under the 'gui.' prefix) and batch modes
+
+
+def enable_log(path, level=logging.INFO):
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(message)s'))    # Records are already JSON
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+# ----- Opt-in profiler around a block: cProfile (stdlib) or pyinstrument if installed -----
+@contextmanager
+def profiled(profiler='cprofile', output=None, top=25):
+    if profiler is None:
+        yield
+        return
+
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            text = prof.output_text(unicode=True)
+            if output:
+                with open(output, 'w') as f:
+                    f.write(prof.output_html() if output.endswith('.html') else text)
+            print(text)
+        return
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        if output:
+            prof.dump_stats(output)    # Open with snakeviz or pstats
+        stream = io.StringIO()
+        pstats.Stats(prof, stream=stream).sort_stats('cumulative').print_stats(top)
+        print(stream.getvalue())
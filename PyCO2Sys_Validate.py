@@ -0,0 +1,164 @@
+import numpy as np
+from PyCO2Sys_Timing import timer
+
+# ----- Input Validation Usage -----
+# Whole input columns are parsed and checked with array masks in one pass, so a 10^6 row file validates in
+# milliseconds. Each problem becomes one row of a report (row, field, value, problem, severity):
+#     parsed, valid, report = validate_table(df, columns, par1_type=1, par2_type=2, opt_k_carbonic=16)
+# Rows with errors (missing or non-numeric values, unphysical ranges, invalid parameter pairs) are quarantined by
+# batch mode instead of failing the job. Samples outside the selected K1/K2 constant set's calibration range are
+# only reported as warnings and still solved.
+
+value_keys = ['par1', 'par2', 'salinity', 'temperature', 'pressure']
+uncertainty_keys = value_keys    # Every value can carry a ± error
+
+# ----- Physical ranges (inclusive) -----
+physical_ranges = {'salinity': (0, 50), 'temperature': (-2.5, 50), 'pressure': (0, 11000)}    # dbar
+par_ranges = {1: (0, 20000), 2: (0, 20000), 3: (0, 14), 4: (0, 1e6)}    # μmol·kg−1, μmol·kg−1, pH, μatm
+
+# ----- Calibration range of each K1/K2 constant set (code = row + 1): T min, T max (°C), S min, S max -----
+k_carbonic_ranges = np.array([
+    [0, 45, 5, 45],            # 1 Roy et al. (1993)
+    [-1, 40, 10, 50],          # 2 Goyet & Poisson (1989)
+    [2, 35, 20, 40],           # 3 Hansson (1973)
+    [2, 35, 20, 40],           # 4 Mehrbach et al. (1973)
+    [2, 35, 20, 40],           # 5 Hansson & Mehrbach
+    [2, 35, 19, 43],           # 6 GEOSECS
+    [2, 35, 19, 43],           # 7 Peng et al.
+    [0, 50, 0, 0],             # 8 Millero (1979), freshwater
+    [2, 35, 0, 40],            # 9 Cai & Wang (1998)
+    [2, 35, 19, 43],           # 10 Lueker et al. (2000)
+    [0, 45, 5, 42],            # 11 Mojica Prieto & Millero (2002)
+    [-1.6, 35, 34, 37],        # 12 Millero et al. (2002)
+    [0, 50, 1, 50],            # 13 Millero et al. (2006)
+    [0, 50, 1, 50],            # 14 Millero (2010)
+    [0, 50, 1, 50],            # 15 Waters et al. (2014)
+    [-1.67, 31.8, 30.7, 37.6],  # 16 Sulpis et al. (2020)
+    [15, 35, 19.6, 41],        # 17 Schockman & Byrne (2021)
+])
+
+report_columns = ['row', 'field', 'value', 'problem', 'severity']
+
+
+# ----- Parse a column (or list of entries) to floats in one pass: ' -1.5', '1e3' parse, anything else is NaN -----
+def parse_numeric(values):
+    import pandas as pd
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+# ----- Check parsed float arrays with masks, returning (row positions, field, problem, severity) per problem -----
+def check_values(values, par_types, opt_k_carbonic=16):
+    n_rows = len(values['par1'])
+    issues = []
+
+    def flag(mask, field, problem, severity='error'):
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            issues.append((rows, field, problem, severity))
+
+    for key in value_keys + ['u_' + key for key in uncertainty_keys if 'u_' + key in values]:
+        flag(np.isnan(values[key]), key, 'missing or not a number')
+    for key, (low, high) in physical_ranges.items():
+        flag((values[key] < low) | (values[key] > high), key, f'outside {low} to {high}')
+    for key in uncertainty_keys:
+        if 'u_' + key in values:
+            flag(values['u_' + key] < 0, 'u_' + key, 'negative uncertainty')
+
+    # ----- Parameter pair: two different codes 1-4, each value within the range of its parameter -----
+    for i, types in enumerate(par_types, 1):
+        flag(~np.isin(types, list(par_ranges)), f'par{i}_type', 'not a parameter code 1-4')
+        for code, (low, high) in par_ranges.items():
+            par = values[f'par{i}']
+            flag((types == code) & ((par < low) | (par > high)), f'par{i}', f'outside {low} to {high}')
+    flag(par_types[0] == par_types[1], 'par2_type', 'same parameter as par1_type')
+
+    # ----- K1/K2 calibration range of the selected constant set (warning only) -----
+    codes = np.broadcast_to(np.asarray(opt_k_carbonic), n_rows)
+    known = np.isin(codes, np.arange(1, len(k_carbonic_ranges) + 1))
+    flag(~known, 'opt_k_carbonic', f'not a K1/K2 constant set code 1-{len(k_carbonic_ranges)}')
+    t_min, t_max, s_min, s_max = k_carbonic_ranges[np.where(known, codes, 1).astype(int) - 1].T
+    temperature, salinity = values['temperature'], values['salinity']
+    flag(known & ((temperature < t_min) | (temperature > t_max)), 'temperature',
+         'outside the K1/K2 constant set calibration range', 'warning')
+    flag(known & ((salinity < s_min) | (salinity > s_max)), 'salinity',
+         'outside the K1/K2 constant set calibration range', 'warning')
+    return issues
+
+
+# ----- Check one entered sample (e.g. the GUI entry boxes) of value_keys and 'u_' keys: (field, problem, severity) -----
+def check_sample(sample, par1_type, par2_type, opt_k_carbonic=16):
+    values = {key: parse_numeric([value]) for key, value in sample.items()}
+    par_types = [np.full(1, par1_type, dtype=float), np.full(1, par2_type, dtype=float)]
+    return [issue[1:] for issue in check_values(values, par_types, opt_k_carbonic)]
+
+
+# ----- Parse and check a whole table; columns maps input keys to column names as batch.default_columns -----
+# Returns df with text input columns parsed to numbers, a mask of rows without errors, and the report
+def validate_table(df, columns, par1_type=None, par2_type=None, opt_k_carbonic=16):
+    import pandas as pd
+    with timer.stage('validate', rows=len(df)):
+        fixed = {'par1_type': par1_type, 'par2_type': par2_type}
+        values, shown, parsed_columns = {}, {}, {}
+        for key in value_keys + ['u_' + key for key in uncertainty_keys] + list(fixed):
+            if fixed.get(key) is not None:
+                values[key] = np.full(len(df), fixed[key], dtype=float)
+            elif columns[key] in df:
+                values[key] = parse_numeric(df[columns[key]])
+                if not pd.api.types.is_numeric_dtype(df[columns[key]]):
+                    parsed_columns[columns[key]] = values[key]
+            elif not key.startswith('u_'):    # Missing uncertainty columns count as zero error
+                raise KeyError(f'Input column "{columns[key]}" for {key} not found')
+            else:
+                continue
+            shown[key] = df[columns[key]].to_numpy() if fixed.get(key) is None else values[key]
+        shown['opt_k_carbonic'] = np.broadcast_to(opt_k_carbonic, len(df))
+
+        issues = check_values(values, [values['par1_type'], values['par2_type']], opt_k_carbonic)
+        valid = np.ones(len(df), dtype=bool)
+        for rows, _, _, severity in issues:
+            if severity == 'error':
+                valid[rows] = False
+
+        # ----- Report: field/problem/severity as categoricals, values as given (one object per reported row) -----
+        issue = np.repeat(np.arange(len(issues)), [len(rows) for rows, *_ in issues]).astype(int)
+
+        def labels(names):
+            categories, codes = np.unique(np.array(names, dtype=object).astype(str), return_inverse=True)
+            return pd.Categorical.from_codes(codes[issue], categories)
+
+        rows = np.concatenate([rows for rows, *_ in issues] or [np.array([], dtype=int)])
+        report = pd.DataFrame({
+            'row': df.index.to_numpy()[rows],
+            'field': labels([columns.get(field, field) for _, field, _, _ in issues]),
+            'value': np.concatenate([shown[field][rows].astype(object) for rows, field, *_ in issues] or
+                                    [np.array([], dtype=object)]),
+            'problem': labels([problem for _, _, problem, _ in issues]),
+            'severity': labels([severity for *_, severity in issues]),
+        }, columns=report_columns).sort_values('row', kind='stable', ignore_index=True)
+
+        # ----- Text columns (e.g. a CSV column with one bad entry) are replaced by their parsed numbers -----
+        parsed = df.assign(**parsed_columns)
+    return parsed, valid, report
+
+
+# ----- Rows with errors, kept as text, plus one column listing their problems -----
+# Messages are joined with vectorized string concatenation, one pass per error count (the report is sorted by row)
+def quarantine_rows(df, valid, report):
+    import pandas as pd
+    errors = report[report['severity'] == 'error']
+    messages = errors['field'].astype('string') + ' ' + errors['problem'].astype('string')
+    nth = errors.groupby('row', sort=False).cumcount().to_numpy()
+    rows = errors['row'].to_numpy()
+    joined = pd.Series(messages.to_numpy()[nth == 0], index=rows[nth == 0], dtype='string')
+    for k in range(1, nth.max() + 1 if len(nth) else 1):
+        more = nth == k
+        joined.loc[rows[more]] += '; ' + pd.Series(messages.to_numpy()[more], index=rows[more], dtype='string')
+    bad = df[~valid].astype('string')
+    bad['errors'] = joined.reindex(bad.index).to_numpy()
+    return bad
+
+
+# ----- Report with plain columns for writing: int64 rows, text fields (categoricals break streamed Arrow) -----
+def plain_report(report):
+    return report.astype({'row': 'int64', 'field': 'string', 'value': 'string', 'problem': 'string',
+                          'severity': 'string'})
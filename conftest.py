@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+import PyCO2Sys_Batch as batch
+
+
+# ----- Four samples, rows 0 and 2 identical (a replicate) -----
+@pytest.fixture
+def samples():
+    return pd.DataFrame({'par1': [2300, 2250, 2300, 2400], 'par2': [2100, 2000, 2100, 2150],
+                         'salinity': [35, 34, 35, 36], 'temperature': [25, 10, 25, 2], 'pressure': [0, 100, 0, 1000],
+                         'u_par1': [2, 2, 2, 3], 'u_par2': [2, 2, 2, 3]})
+
+
+# ----- Single sample solved on its own, for comparison with the vectorized paths -----
+def scalar_solve(row, out, **opts):
+    co2sys = batch.solve(row['par1'], row['par2'], 1, 2, row['salinity'], row['temperature'], row['pressure'],
+                         {'par1': row['u_par1'], 'par2': row['u_par2']}, **opts)
+    return float(co2sys[out])
+
+
+@pytest.fixture
+def scalar():
+    return scalar_solve
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+import PyCO2Sys_Batch as batch
+
+# ----- Headless batch checks: python -m pytest -q -----
+
+
+def test_solve_table_matches_scalar_solve(samples, scalar):
+    results = batch.solve_table(samples, par1_type=1, par2_type=2)
+    for i, row in samples.iterrows():
+        for out in ['pH', 'pCO2', 'u_pH']:
+            assert results.loc[i, out] == pytest.approx(scalar(row, out))
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.parquet'])
+def test_solve_stream_round_trip(samples, tmp_path, ext):
+    in_path, out_path = tmp_path / f'in{ext}', tmp_path / f'out{ext}'
+    batch.write_table(samples, in_path)
+    assert batch.solve_stream(in_path, out_path, 2, par1_type=1, par2_type=2, outputs=batch.par_codes) == (4, 0)
+    solved = batch.read_table(out_path)
+    expected = batch.solve_table(samples, par1_type=1, par2_type=2, outputs=batch.par_codes)
+    assert len(solved) == 4
+    np.testing.assert_allclose(solved['out_pH'], expected['pH'])
+
+
+def test_solve_stream_parquet_with_changing_chunk_dtypes(samples, tmp_path):
+    samples = samples.assign(salinity=[35, 34, 34.5, 36])    # Whole numbers in the first chunk only
+    samples.to_csv(tmp_path / 'in.csv', index=False)
+    n_rows, _ = batch.solve_stream(tmp_path / 'in.csv', tmp_path / 'out.parquet', 2, par1_type=1, par2_type=2,
+                                   outputs=batch.par_codes)
+    assert n_rows == 4
+    assert list(pd.read_parquet(tmp_path / 'out.parquet')['salinity']) == [35, 34, 34.5, 36]
+
+
+def test_streamed_parquet_schema_matches_solve_file(samples, tmp_path):
+    samples.assign(par1_type=1, par2_type=2).to_csv(tmp_path / 'in.csv', index=False)
+    batch.solve_file(tmp_path / 'in.csv', tmp_path / 'file.parquet', outputs=batch.par_codes)
+    batch.solve_stream(tmp_path / 'in.csv', tmp_path / 'stream.parquet', 2, outputs=batch.par_codes)
+    whole, streamed = pq.read_schema(tmp_path / 'file.parquet'), pq.read_schema(tmp_path / 'stream.parquet')
+    assert whole.remove_metadata() == streamed.remove_metadata()
+    assert str(streamed.field('par1_type').type) == 'int64'
+
+
+def test_solve_table_parallel_keeps_row_order(samples):
+    many = pd.concat([samples] * 5, ignore_index=True).assign(temperature=np.linspace(2, 30, 20))
+    parallel = batch.solve_table_parallel(many, 3, par1_type=1, par2_type=2, outputs=batch.par_codes)
+    serial = batch.solve_table(many, par1_type=1, par2_type=2, outputs=batch.par_codes)
+    assert list(parallel.index) == list(many.index)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_dedupe_scatters_back_to_duplicates(samples):
+    deduped = batch.solve_table(samples, par1_type=1, par2_type=2, outputs=batch.par_codes)
+    plain = batch.solve_table(samples, par1_type=1, par2_type=2, outputs=batch.par_codes, dedupe=False)
+    inputs, inverse = batch.dedupe_inputs(batch.table_inputs(samples, par1_type=1, par2_type=2))
+    assert len(inputs['par1']) == 3 and list(inverse) == [1, 0, 1, 2]
+    pd.testing.assert_frame_equal(deduped, plain)
+    assert deduped.loc[0, 'pH'] == deduped.loc[2, 'pH']
+
+
+def test_solve_cache_keys_on_uncertainties_and_outputs(tmp_path):
+    cache = batch.SolveCache(path=tmp_path / 'cache.json')
+    plain = cache.solve(2300, 2100, 1, 2, 35, 25, 0)
+    zero_u = cache.solve(2300, 2100, 1, 2, 35, 25, 0, {key: 0 for key in batch.uncertainty_keys})
+    assert 'u_pH' not in plain and zero_u['u_pH'] == 0
+    assert cache.solve(2300, 2100, 1, 2, 35, 25, 0) is plain
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 2}
+
+
+def test_solve_cache_file_is_trimmed_and_survives_corruption(tmp_path):
+    cache = batch.SolveCache(path=tmp_path / 'cache.json')
+    for temperature in [5, 10, 15]:
+        cache.solve(2300, 2100, 1, 2, 35, temperature, 0)
+    cache.save()
+    assert batch.SolveCache(path=tmp_path / 'cache.json').stats()['size'] == 3
+    assert batch.SolveCache(maxsize=2, path=tmp_path / 'cache.json').stats()['size'] == 2
+    (tmp_path / 'cache.json').write_text('[[truncated')
+    assert batch.SolveCache(path=tmp_path / 'cache.json').stats()['size'] == 0
@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime
+import numpy as np
+import openpyxl as px
+import pytest
+import PyCO2Sys_Batch as batch
+import PyCO2Sys_History as hist
+
+# ----- Result history store checks: python -m pytest -q -----
+
+
+@pytest.fixture(params=['history.sqlite', 'history.csv'])
+def history(request, tmp_path):
+    store = hist.open_history(str(tmp_path / request.param), buffer_size=3)
+    yield store
+    store.close()
+
+
+def result(value=1.0):
+    return {field: value for field in hist.result_fields}
+
+
+def test_append_from_threads_keeps_every_row(history):
+    def append():
+        for _ in range(200):
+            history.append(hist.history_row(result()))
+
+    threads = [threading.Thread(target=append) for _ in range(2)] + \
+              [threading.Thread(target=lambda: [history.rows() for _ in range(20)])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(history.rows()) == 400
+
+
+def test_xlsx_round_trip_with_text_timestamps(history, tmp_path):
+    workbook = px.Workbook()
+    page = workbook.active
+    page.append(['PyCO2Sys Result History']), page.append([]), page.append(['Time'])
+    page.append([datetime(2024, 5, 1, 12, 0), 2300, 2100, 8.0, 400, None, 2, 2, 0.01, 5])
+    page.append(['1 May 2024, morning', 2310, 2110, 8.1, 390, None, 2, 2, 0.01, 5])    # Text in column A
+    workbook.save(tmp_path / 'old.xlsx')
+
+    assert hist.import_xlsx(history, tmp_path / 'old.xlsx') == 2
+    hist.export_xlsx(history, tmp_path / 'new.xlsx')
+    exported = px.load_workbook(tmp_path / 'new.xlsx').active
+    assert exported['A4'].value == datetime(2024, 5, 1, 12, 0)
+    assert exported['A5'].value == '1 May 2024, morning'
+    assert exported['B5'].value == 2310
+
+
+@pytest.fixture
+def solved_history(samples, tmp_path):
+    store = hist.open_history(str(tmp_path / 'history.sqlite'), buffer_size=1)
+    for _, row in samples.iterrows():
+        inputs = {**row.to_dict(), 'par1_type': 1, 'par2_type': 2, 'u_salinity': 0, 'u_temperature': 0,
+                  'u_pressure': 0, **batch.default_opts}
+        co2sys = batch.solve(row['par1'], row['par2'], 1, 2, row['salinity'], row['temperature'], row['pressure'],
+                             {'par1': row['u_par1'], 'par2': row['u_par2']})
+        store.append(hist.history_row(co2sys, inputs))
+    store.append(hist.history_row(result()))    # No stored inputs
+    yield store
+    store.close()
+
+
+def test_recompute_skips_unchanged_and_resolves_changed(solved_history, samples, scalar):
+    assert hist.recompute(solved_history) == (0, 5, 0)
+    assert hist.recompute(solved_history, {'opt_k_carbonic': '10'}, {'temperature': '25'}) == (2, 3, 0)
+    rows = solved_history.rows()
+    assert [row['opt_k_carbonic'] for row in rows[:4]] == [10, 16, 10, 16]
+    assert rows[0]['pH'] == pytest.approx(scalar(samples.loc[0], 'pH', opt_k_carbonic=10), abs=1e-9)
+    assert hist.recompute(solved_history) == (0, 5, 0)
+
+
+def test_recompute_rejects_invalid_inputs_and_nan_results(solved_history, monkeypatch):
+    before = solved_history.rows()
+    assert hist.recompute(solved_history, {'opt_k_bisulfate': 4}) == (0, 1, 4)
+    assert hist.recompute(solved_history, {'salinity': -1}, {'temperature': 25}) == (0, 3, 2)
+
+    solve = batch.solve
+    monkeypatch.setattr(batch, 'solve', lambda *args, **kwargs: {**solve(*args, **kwargs), 'pH': np.nan})
+    assert hist.recompute(solved_history, {'opt_k_carbonic': 10}) == (0, 1, 4)
+    assert solved_history.rows() == before
+
+
+@pytest.mark.parametrize('pair', ['opt_k_carbonic=ten', 'par1_type=1.7', 'salinity=', 'depth=10'])
+def test_parse_assignments_rejects_bad_values(pair):
+    with pytest.raises(SystemExit):
+        hist.main(['recompute', '--set', pair])
@@ -0,0 +1,22 @@
+import numpy as np
+import PyCO2Sys_MonteCarlo as mc
+
+# ----- Monte Carlo checks: python -m pytest -q -----
+
+
+def test_draws_above_max_rows_are_solved_in_slices(samples, monkeypatch):
+    solved_rows = []
+    solve = mc.batch.solve
+
+    def counting_solve(**inputs):
+        solved_rows.append(len(inputs['par1']))
+        return solve(**inputs)
+
+    monkeypatch.setattr(mc.batch, 'solve', counting_solve)
+    stats = mc.monte_carlo(samples.iloc[:2], par1_type=1, par2_type=2, draws=500, max_rows=200, seed=0)
+    assert max(solved_rows) <= 200 and sum(solved_rows) == 2 * 500
+
+    again = mc.monte_carlo(samples.iloc[:2], par1_type=1, par2_type=2, draws=500, max_rows=200, seed=0)
+    np.testing.assert_array_equal(stats.to_numpy(), again.to_numpy())    # Fixed seed is reproducible
+    assert (stats['pH_p2.5'] < stats['pH_p50']).all() and (stats['pH_p50'] < stats['pH_p97.5']).all()
+    assert np.allclose(stats['pH_std'], 0.006, rtol=0.3)    # Near the linear u_pH for ± 2 μmol·kg−1
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+import PyCO2Sys_Batch as batch
+from PyCO2Sys_Results import ResultTable
+
+# ----- Columnar result table checks: python -m pytest -q -----
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load_round_trip(samples, scalar, tmp_path, mmap):
+    results = batch.solve_results(samples, par1_type=1, par2_type=2, outputs=['pH', 'pCO2', 'u_pH'])
+    results.save(tmp_path / 'results.arrow')
+    loaded = ResultTable.load(tmp_path / 'results.arrow', mmap=mmap)
+
+    assert loaded.names == ['pH', 'pCO2', 'u_pH'] and len(loaded) == len(samples)
+    for name in loaded.names:
+        assert loaded[name].dtype == np.float64
+        np.testing.assert_array_equal(loaded[name], results[name])
+    assert loaded['u_pH'][3] == pytest.approx(scalar(samples.loc[3], 'u_pH'))
+    assert 'dic' not in loaded
+
+
+def test_columns_must_have_one_length():
+    with pytest.raises(ValueError):
+        ResultTable({'pH': np.zeros(3), 'pCO2': np.zeros(2)})
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import PyCO2Sys_Server as server
+
+# ----- Solve service checks against localhost: python -m pytest -q -----
+
+sample = {'par1': 2300, 'par2': 2100, 'par1_type': 1, 'par2_type': 2, 'uncertainty_from': {'par1': 2}}
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n\r\n'.encode()
+                 + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def start_server(service):
+    tcp = await asyncio.start_server(server.make_handler(service), '127.0.0.1', 0)
+    return tcp, tcp.sockets[0].getsockname()[1]
+
+
+def test_batching_bad_requests_and_health():
+    async def run():
+        service = server.SolveService(workers=1, window_ms=200)
+        await service.start()
+        tcp, port = await start_server(service)
+        try:
+            bodies = [sample, {**sample, 'par1': 2310}, {**sample, 'par1': 2320}, {**sample, 'par2_type': 1}]
+            responses = await asyncio.gather(*(request(port, 'POST', '/solve', body) for body in bodies))
+            assert [status for status, _ in responses] == [200, 200, 200, 400]
+            assert all(result['batch_size'] == 3 for _, result in responses[:3])
+            assert responses[0][1]['pH'] < responses[2][1]['pH']    # More alkalinity, same DIC
+            assert 'same parameter' in responses[3][1]['error']
+
+            assert (await request(port, 'POST', '/solve', {**sample, 'par1_type': 1.7}))[0] == 400
+            status, health = await request(port, 'GET', '/health')
+            assert status == 200 and health['requests'] == 3 and health['batches'] == 1
+        finally:
+            tcp.close()
+            await service.stop()
+    asyncio.run(run())
+
+
+def test_full_queue_answers_503():
+    async def run():
+        service = server.SolveService(workers=1, queue_size=1)    # Batcher not started, so requests stay queued
+        tcp, port = await start_server(service)
+        try:
+            waiting = asyncio.create_task(request(port, 'POST', '/solve', sample))
+            while service.queue.empty():
+                await asyncio.sleep(0.01)
+            status, body = await request(port, 'POST', '/solve', sample)
+            assert status == 503 and service.health()['rejected'] == 1
+            waiting.cancel()
+        finally:
+            tcp.close()
+            service.pool.shutdown()
+    asyncio.run(run())
@@ -0,0 +1,27 @@
+import pytest
+import PyCO2Sys_Sweep as sweep
+
+# ----- Constant-set sweep checks: python -m pytest -q -----
+
+subset = {'opt_k_carbonic': [10, 16], 'opt_k_bisulfate': [1, 2], 'opt_total_borate': [2], 'opt_k_fluoride': [1]}
+
+
+def test_sweep_matches_scalar_solve_for_one_combination(samples, scalar):
+    tidy, bad = sweep.sweep(samples, par1_type=1, par2_type=2, subset=subset)
+    assert len(bad) == 0 and len(tidy) == 4 * 4
+    row = tidy[(tidy['sample'] == 1) & (tidy['opt_k_carbonic'] == 10) & (tidy['opt_k_bisulfate'] == 2)]
+    expected = scalar(samples.loc[1], 'pH', opt_k_carbonic=10, opt_k_bisulfate=2, opt_total_borate=2)
+    assert row['pH'].item() == pytest.approx(expected)
+
+
+def test_sweep_in_parallel_blocks_matches_serial(samples):
+    serial, _ = sweep.sweep(samples, par1_type=1, par2_type=2, subset=subset)
+    parallel, _ = sweep.sweep(samples, par1_type=1, par2_type=2, subset=subset, block_rows=3, workers=2)
+    assert parallel.equals(serial)
+
+
+def test_sweep_quarantines_invalid_samples(samples):
+    samples.loc[2, 'salinity'] = -1
+    tidy, bad = sweep.sweep(samples, par1_type=1, par2_type=2, subset=subset)
+    assert list(bad.index) == [2] and 'salinity' in bad.loc[2, 'errors']
+    assert sorted(tidy['sample'].unique()) == [0, 1, 3]
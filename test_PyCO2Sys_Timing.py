@@ -0,0 +1,39 @@
+import threading
+import pytest
+from PyCO2Sys_Timing import StageTimer
+
+# ----- Stage timer checks: python -m pytest -q -----
+
+
+def test_summary_percentiles_and_window():
+    timer = StageTimer(window=4)
+    for seconds in [9.0, 1.0, 2.0, 3.0, 4.0]:    # The first falls out of the rolling window
+        timer.record('solve', seconds)
+    stats = timer.summary('solve')
+    assert stats['count'] == 4 and stats['last'] == 4.0 and stats['max'] == 4.0
+    assert stats['p50'] == pytest.approx(2.5) and stats['mean'] == pytest.approx(2.5)
+    assert timer.summary('render') == {'count': 0}
+    assert sum(timer.histogram('solve', bins=2)['counts']) == 4
+
+
+def test_quiet_only_skips_this_thread():
+    timer = StageTimer()
+    with timer.quiet():
+        with timer.stage('solve'):
+            pass
+        other = threading.Thread(target=lambda: timer.record('solve', 1.0))
+        other.start()
+        other.join()
+    timer.record('solve', 2.0)
+    assert timer.summary('solve')['count'] == 2 and timer.summary('solve')['max'] == 2.0
+
+
+def test_prefixed_stages_are_kept_apart():
+    timer = StageTimer()
+    timer.record('solve', 1.0)
+    with timer.prefixed('gui.'):
+        timer.record('solve', 0.001)
+    assert timer.stages() == ['solve', 'gui.solve']
+    assert timer.summary('solve')['count'] == 1
+    assert timer.readout(['solve'], 'gui.').startswith('solve: 1.0 ms')
+    assert timer.readout(prefix='gui.') == timer.readout(['solve'], 'gui.')
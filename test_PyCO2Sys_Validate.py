@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import PyCO2Sys_Batch as batch
+from PyCO2Sys_Validate import quarantine_rows, validate_table
+
+# ----- Input validation and quarantine checks: python -m pytest -q -----
+
+
+@pytest.fixture
+def bad_samples(samples):
+    samples = samples.astype({'par1': object, 'temperature': object})
+    samples.loc[1, 'par1'] = 'abc'
+    samples.loc[2, 'salinity'] = 60
+    samples.loc[2, 'pressure'] = -5    # Two errors in one row
+    samples.loc[3, 'temperature'] = '-1.5'    # Negative text value parses
+    return samples
+
+
+def test_validate_table_quarantines_bad_rows(bad_samples, tmp_path):
+    parsed, valid, report = validate_table(bad_samples, batch.default_columns, 1, 2)
+    assert list(valid) == [True, False, False, True]
+    assert parsed.loc[3, 'temperature'] == -1.5
+    errors = report[report['severity'] == 'error']
+    assert list(errors['row']) == [1, 2, 2] and list(errors['field']) == ['par1', 'salinity', 'pressure']
+
+    bad = quarantine_rows(bad_samples, valid, report)
+    assert list(bad.index) == [1, 2] and bad.loc[1, 'par1'] == 'abc'
+    assert list(bad['errors']) == ['par1 missing or not a number',
+                                   'salinity outside 0 to 50; pressure outside 0 to 11000']
+
+    bad_samples.to_csv(tmp_path / 'in.csv', index=False)
+    n_rows, n_bad = batch.solve_file(tmp_path / 'in.csv', tmp_path / 'out.csv', par1_type=1, par2_type=2,
+                                     outputs=batch.par_codes, quarantine_path=tmp_path / 'bad.csv')
+    assert (n_rows, n_bad) == (2, 2)
+    assert len(pd.read_csv(tmp_path / 'bad.csv')['errors']) == 2
+
+
+def test_validate_table_rejects_identical_parameter_types(samples):
+    _, valid, _ = validate_table(samples, batch.default_columns, 1, 1)
+    assert not valid.any()
+
+
+def test_quarantine_rows_without_errors(samples):
+    _, valid, report = validate_table(samples, batch.default_columns, 1, 2)
+    assert len(quarantine_rows(samples, valid, report)) == 0
+
+
+@pytest.mark.parametrize('ext', ['.arrow', '.parquet', '.csv'])
+def test_streamed_report_matches_whole_file_report(bad_samples, tmp_path, ext):
+    bad_samples.to_csv(tmp_path / 'in.csv', index=False)
+    assert batch.solve_stream(tmp_path / 'in.csv', tmp_path / f'out{ext}', 1, par1_type=1, par2_type=2,
+                              outputs=batch.par_codes, report_path=tmp_path / f'streamed{ext}') == (2, 2)
+    batch.solve_file(tmp_path / 'in.csv', tmp_path / f'out{ext}', par1_type=1, par2_type=2, outputs=batch.par_codes,
+                     report_path=tmp_path / f'whole{ext}')
+
+    streamed, whole = batch.read_table(tmp_path / f'streamed{ext}'), batch.read_table(tmp_path / f'whole{ext}')
+    pd.testing.assert_frame_equal(streamed, whole)
+    assert streamed['row'].dtype == np.int64 and list(streamed['row']) == [1, 2, 2, 2]    # Salinity 60 is also a K1/K2 range warning
+    if ext == '.arrow':
+        schema = pa.ipc.open_file(str(tmp_path / f'streamed{ext}')).schema
+        assert schema.field('row').type == pa.int64() and not pa.types.is_dictionary(schema.field('field').type)